@@ -3,7 +3,10 @@
 JSON/JSONC validator with duplicate key detection.
 
 Usage:
-    python json-validator.py [--fix] [--quiet] <file1> [file2...]
+    python json-validator.py [--fix] [--quiet] [--jobs N] [--no-cache] <file1> [file2...]
+
+Files that validated clean are remembered in $XDG_CACHE_HOME/json-validator
+and skipped while their content is unchanged.
 
 Exit codes:
     0 - All files valid
@@ -12,9 +15,14 @@ Exit codes:
 """
 
 import json
+import hashlib
+import os
 import re
 import sys
+import bisect
 import argparse
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
 from pathlib import Path
 from typing import Optional
 
@@ -23,268 +31,402 @@ class ValidationError:
     """Represents a validation error with location info."""
 
     def __init__(self, error_type: str, message: str, line: Optional[int] = None,
-                 key: Optional[str] = None, value: Optional[str] = None):
+                 key: Optional[str] = None, value: Optional[str] = None,
+                 column: Optional[int] = None, path: Optional[str] = None):
         self.error_type = error_type
         self.message = message
         self.line = line
+        self.column = column
         self.key = key
+        self.path = path
         self.value = value
 
     def __str__(self):
         location = f"line {self.line}" if self.line else "unknown location"
+        if self.line and self.column:
+            location += f", column {self.column}"
         if self.key:
-            return f"{self.error_type} at {location}: \"{self.key}\" - {self.message}"
+            return f"{self.error_type} at {location}: \"{self.path or self.key}\" - {self.message}"
         return f"{self.error_type} at {location}: {self.message}"
 
 
+# JSONC lexical pieces. Strings are matched whole (escapes included) so that
+# comment markers and brackets inside them are never seen by the scanners.
+_STRING = r'"[^"\\]*(?:\\.[^"\\]*)*"?'
+_COMMENT = r'//[^\n]*|/\*.*?(?:\*/|\Z)'
+
+# Strings and comments only: used to strip comments
+JSONC_SKIP = re.compile(rf'(?P<string>{_STRING})|(?P<comment>{_COMMENT})', re.S)
+
+
 def strip_jsonc_comments(content: str) -> str:
     """
     Strip JSONC comments from content while preserving line numbers.
     Handles both // single-line and /* multi-line */ comments.
     """
-    result = []
-    i = 0
-    in_string = False
-
-    while i < len(content):
-        char = content[i]
-
-        # Track string boundaries
-        if char == '"' and (i == 0 or content[i-1] != '\\'):
-            in_string = not in_string
-            result.append(char)
-            i += 1
-            continue
+    if '/' not in content:
+        return content
 
-        # Don't process comments inside strings
-        if in_string:
-            result.append(char)
-            i += 1
+    pieces = []
+    last = 0
+    for match in JSONC_SKIP.finditer(content):
+        if match.lastgroup != 'comment':
             continue
+        pieces.append(content[last:match.start()])
+        # Keep the newlines of block comments for line counting
+        pieces.append('\n' * match.group().count('\n'))
+        last = match.end()
+    pieces.append(content[last:])
+    return ''.join(pieces)
 
-        # Check for single-line comment
-        if i + 1 < len(content) and content[i:i+2] == '//':
-            # Skip until end of line, preserve newline for line counting
-            while i < len(content) and content[i] != '\n':
-                i += 1
-            continue
 
-        # Check for multi-line comment
-        if i + 1 < len(content) and content[i:i+2] == '/*':
-            # Skip until */, preserve newlines for line counting
-            i += 2
-            while i + 1 < len(content) and content[i:i+2] != '*/':
-                if content[i] == '\n':
-                    result.append('\n')
-                i += 1
-            i += 2  # Skip */
-            continue
+class JsoncParser:
+    """
+    Position-tracking JSONC parser.
+    Walks the original text once, treating comments as whitespace, and
+    records every object key with its offset and object path, so syntax
+    errors and duplicate keys are reported at their exact location.
+    The members shadowed by a later duplicate are kept in `shadowed` as
+    [key offset, offset of the comma after the value].
+    Accepts what json.loads accepts after comment stripping.
+    """
 
-        result.append(char)
-        i += 1
+    # Unambiguous so a failed token match cannot backtrack into the skipped text
+    SKIP = re.compile(r'(?:[ \t\n\r]|//[^\n]*|/\*(?:[^*]|\*(?!/))*\*/)*')
+    # Leading whitespace and comments are consumed with each token
+    TOKEN = re.compile(SKIP.pattern + r'''
+        (?:
+        (?P<string>"[^"\\\x00-\x1f]*(?:\\(?:["\\/bfnrt]|u[0-9a-fA-F]{4})[^"\\\x00-\x1f]*)*")
+      | (?P<number>-?(?:0|[1-9][0-9]*)(?:\.[0-9]+)?(?:[eE][-+]?[0-9]+)?)
+      | (?P<literal>true|false|null|NaN|Infinity|-Infinity)
+      | (?P<punct>[{}\[\]:,])
+      | (?P<end>\Z)
+        )
+    ''', re.S | re.X)
+
+    EXPECTING = {
+        'value': "Expecting value",
+        'element': "Expecting value",
+        'value_or_close': "Expecting value",
+        'key': "Expecting property name enclosed in double quotes",
+        'key_or_close': "Expecting property name enclosed in double quotes",
+        'colon': "Expecting ':' delimiter",
+        'comma_or_close': "Expecting ',' delimiter",
+        'eof': "Extra data",
+    }
 
-    return ''.join(result)
+    def __init__(self, content: str):
+        self.content = content
+        self.duplicates: list[ValidationError] = []
+        self.shadowed: list[list[int]] = []
+        self._line_starts: Optional[list[int]] = None
+
+    def position(self, offset: int) -> tuple[int, int]:
+        """1-based (line, column) of an offset"""
+        if self._line_starts is None:
+            self._line_starts = [0] + [m.end() for m in re.finditer('\n', self.content)]
+        line = bisect.bisect_right(self._line_starts, offset)
+        return line, offset - self._line_starts[line - 1] + 1
+
+    def error(self, message: str, offset: int) -> ValidationError:
+        line, column = self.position(offset)
+        return ValidationError("SYNTAX_ERROR", message, line=line, column=column)
+
+    def parse(self) -> list[ValidationError]:
+        """
+        Parse the whole document. Returns the first syntax error, or every
+        duplicate key when the syntax is valid.
+        """
+        content = self.content
+        match_token = self.TOKEN.match
+        end = len(content)
+        # Open containers: [kind, path, {key: [first offset, latest member]} or
+        # element index, pending key path, current member]
+        stack: list[list] = []
+        state = 'value'
+        pos = 0
+        comma = 0  # Offset of the last comma, for trailing comma errors
+
+        while True:
+            match = match_token(content, pos)
+            if match is None:
+                return [self.invalid_token(state, pos)]
+            kind = match.lastgroup
+            if kind == 'end':
+                if state == 'eof':
+                    return self.duplicates
+                return [self.error(self.EXPECTING[state], end)]
+            token = match.group(kind)
+            start, pos = match.start(kind), match.end()
+            top = stack[-1] if stack else None
+
+            if state in ('value', 'element', 'value_or_close'):
+                if token == ']' and state != 'value' and top is not None and top[0] == '[':
+                    if state == 'element':
+                        return [self.error("Illegal trailing comma before end of array", comma)]
+                    stack.pop()
+                elif kind == 'punct' and token in '{[':
+                    stack.append([token, self.child_path(top), {} if token == '{' else 0, None, None])
+                    state = 'key_or_close' if token == '{' else 'value_or_close'
+                    continue
+                elif kind == 'punct':
+                    return [self.error("Expecting value", start)]
+                state = 'comma_or_close' if stack else 'eof'
+
+            elif state in ('key', 'key_or_close'):
+                if kind == 'string':
+                    self.add_key(top, token, start, pos)
+                    state = 'colon'
+                elif token == '}':
+                    if state == 'key':
+                        return [self.error("Illegal trailing comma before end of object", comma)]
+                    stack.pop()
+                    state = 'comma_or_close' if stack else 'eof'
+                else:
+                    return [self.error(self.EXPECTING[state], start)]
+
+            elif state == 'colon':
+                if token != ':':
+                    return [self.error(self.EXPECTING[state], start)]
+                state = 'value'
+
+            elif state == 'comma_or_close':
+                if token == ',':
+                    comma = start
+                    if top[0] == '{':
+                        top[4][1] = start
+                        state = 'key'
+                    else:
+                        top[2] += 1
+                        state = 'element'
+                elif token == ('}' if top[0] == '{' else ']'):
+                    stack.pop()
+                    state = 'comma_or_close' if stack else 'eof'
+                else:
+                    return [self.error(self.EXPECTING[state], start)]
+
+            else:  # eof
+                return [self.error("Extra data", start)]
+
+    @staticmethod
+    def child_path(top: Optional[list]) -> str:
+        """Path of a value that starts inside container top"""
+        if top is None:
+            return ""
+        if top[0] == '{':
+            return top[3]
+        return f"{top[1]}[{top[2]}]"
+
+    def add_key(self, top: list, token: str, start: int, end: int):
+        """Record a key of the object on top of the stack, flagging duplicates"""
+        name = json.loads(token) if '\\' in token else token[1:-1]
+        path = f"{top[1]}.{name}" if top[1] else name
+        top[3] = path
+        member = [start, None]
+        top[4] = member
+        seen = top[2].get(name)
+        if seen is None:
+            top[2][name] = [start, member]
+            return
+        # The last value wins, as with json.loads
+        self.shadowed.append(seen[1])
+        seen[1] = member
+        first_line, _ = self.position(seen[0])
+        line, column = self.position(start)
+        self.duplicates.append(ValidationError(
+            "DUPLICATE_KEY",
+            f"First occurrence at line {first_line}, duplicate at line {line}",
+            line=line,
+            column=column,
+            key=name,
+            path=path,
+            value=self.content[end:end + 50].split('\n', 1)[0].lstrip(' \t:')
+        ))
 
+    def invalid_token(self, state: str, pos: int) -> ValidationError:
+        """Explain why no token matches at pos"""
+        content = self.content
+        pos = self.SKIP.match(content, pos).end()
+        if content.startswith('"', pos):
+            try:
+                json.decoder.scanstring(content, pos + 1)
+            except json.JSONDecodeError as e:
+                return self.error(e.msg, e.pos)
+        if content.startswith('/*', pos):
+            return self.error("Unterminated comment", pos)
+        return self.error(self.EXPECTING[state], pos)
 
-def find_line_number(content: str, key: str, occurrence: int = 1) -> Optional[int]:
-    """Find the line number of a key in the content."""
-    lines = content.split('\n')
-    count = 0
-    for i, line in enumerate(lines, 1):
-        # Look for the key as a JSON key (with quotes and colon)
-        pattern = rf'"\s*{re.escape(key)}\s*"\s*:'
-        if re.search(pattern, line):
-            count += 1
-            if count == occurrence:
-                return i
-    return None
 
+class _DuplicateKeys(ValueError):
+    pass
 
-def check_duplicate_keys(content: str, stripped_content: str) -> list[ValidationError]:
-    """
-    Check for duplicate keys by parsing with object_pairs_hook.
-    Returns list of ValidationError for any duplicates found.
-    """
-    errors = []
-    key_occurrences = {}  # Track {key_path: [line_numbers]}
-
-    def track_duplicates(pairs, path=""):
-        """Track keys and detect duplicates at current level."""
-        seen = {}
-        result = {}
-
-        for key, value in pairs:
-            full_key = f"{path}.{key}" if path else key
-
-            if key in seen:
-                # Found duplicate
-                line1 = find_line_number(content, key, 1)
-                line2 = find_line_number(content, key, 2)
-                errors.append(ValidationError(
-                    "DUPLICATE_KEY",
-                    f"First occurrence at line {line1}, second at line {line2}",
-                    line=line2,
-                    key=key,
-                    value=str(value)[:50]
-                ))
-            else:
-                seen[key] = True
-
-            # Recursively process nested objects
-            if isinstance(value, dict):
-                result[key] = value
-            else:
-                result[key] = value
-
-        return result
-
-    # Custom decoder that uses object_pairs_hook
-    class DuplicateKeyDecoder(json.JSONDecoder):
-        def __init__(self, *args, **kwargs):
-            super().__init__(object_pairs_hook=track_duplicates, *args, **kwargs)
-
-    try:
-        json.loads(stripped_content, cls=DuplicateKeyDecoder)
-    except json.JSONDecodeError:
-        pass  # Syntax errors handled separately
 
-    return errors
+def _reject_duplicates(pairs: list) -> None:
+    """object_pairs_hook that aborts the parse at the first duplicate key"""
+    if len(pairs) > 1 and len({key for key, _ in pairs}) != len(pairs):
+        raise _DuplicateKeys()
 
 
-def validate_json_syntax(stripped_content: str, original_content: str) -> list[ValidationError]:
+def validate_content(content: str) -> list[ValidationError]:
     """
-    Validate JSON syntax and return list of errors.
+    Validate JSONC text, returning syntax errors or duplicate keys.
+    Clean documents take a single json.loads pass at C speed; only a
+    document with a problem is walked by JsoncParser for exact positions.
     """
-    errors = []
     try:
-        json.loads(stripped_content)
-    except json.JSONDecodeError as e:
-        # Try to find the actual line in original content
-        line = e.lineno
-        errors.append(ValidationError(
-            "SYNTAX_ERROR",
-            e.msg,
-            line=line
-        ))
+        json.loads(strip_jsonc_comments(content), object_pairs_hook=_reject_duplicates)
+        return []
+    except (ValueError, RecursionError) as e:
+        failure = e
+
+    errors = JsoncParser(content).parse()
+    if not errors and isinstance(failure, json.JSONDecodeError):
+        # Should not happen; fall back to the decoder's own report
+        errors = [ValidationError("SYNTAX_ERROR", failure.msg, line=failure.lineno)]
     return errors
 
 
 def fix_duplicate_keys(content: str) -> tuple[str, int]:
     """
-    Remove duplicate keys from JSON content, keeping the last value.
+    Remove duplicate keys from JSONC content, keeping the last value.
+    Only members shadowed within the same object are removed; comments
+    and formatting elsewhere are left untouched.
     Returns (fixed_content, number_of_duplicates_removed).
     """
-    # Handle both single-line and multi-line JSON
-    # Strategy: find all "key": patterns and track duplicates
-
-    # Pattern to match "key": value pairs (handles various formats)
-    # We'll process the content character by character to handle nested structures
-    key_value_pattern = re.compile(r'"([^"]+)"\s*:\s*')
-
-    # Find all key positions
-    key_positions = []  # [(start, end, key, full_match)]
-    for match in key_value_pattern.finditer(content):
-        key = match.group(1)
-        key_positions.append((match.start(), match.end(), key))
-
-    # Track seen keys and find duplicates (keep last)
-    seen_keys = {}  # {key: (position_index, start, end)}
-    duplicates_to_remove = []  # [(start, end)] - ranges to remove
-
-    for idx, (start, end, key) in enumerate(key_positions):
-        if key in seen_keys:
-            # Mark the earlier occurrence for removal
-            old_idx, old_start, old_end = seen_keys[key]
-            # Find the extent of the key-value pair (until the next , or })
-            # This is tricky - we need to find where the value ends
-            value_end = find_value_end(content, old_end)
-            duplicates_to_remove.append((old_start, value_end))
-        seen_keys[key] = (idx, start, end)
-
-    if not duplicates_to_remove:
+    parser = JsoncParser(content)
+    errors = parser.parse()
+    if not parser.shadowed or any(error.error_type == "SYNTAX_ERROR" for error in errors):
         return content, 0
 
-    # Sort duplicates by position (reverse to remove from end first)
-    duplicates_to_remove.sort(key=lambda x: x[0], reverse=True)
-
-    fixed_content = content
-    for start, end in duplicates_to_remove:
-        # Remove the duplicate key-value pair
-        fixed_content = fixed_content[:start] + fixed_content[end:]
-
-    # Clean up: remove double commas and trailing commas
-    fixed_content = re.sub(r',\s*,', ',', fixed_content)
-    fixed_content = re.sub(r',(\s*[}\]])', r'\1', fixed_content)
-    fixed_content = re.sub(r'{\s*,', '{', fixed_content)
-
-    return fixed_content, len(duplicates_to_remove)
-
-
-def find_value_end(content: str, start: int) -> int:
-    """Find where a JSON value ends (at the comma or closing brace)."""
-    depth = 0
-    in_string = False
-    i = start
-
-    while i < len(content):
-        char = content[i]
+    spans = sorted(member_span(content, key, comma) for key, comma in parser.shadowed)
+    pieces = []
+    last = 0
+    for start, end in spans:
+        if start < last:
+            continue  # Inside a member that is already removed
+        pieces.append(content[last:start])
+        last = end
+    pieces.append(content[last:])
+    return ''.join(pieces), len(pieces) - 1
 
-        if char == '"' and (i == 0 or content[i-1] != '\\'):
-            in_string = not in_string
-        elif not in_string:
-            if char in '{[':
-                depth += 1
-            elif char in '}]':
-                if depth == 0:
-                    return i
-                depth -= 1
-            elif char == ',' and depth == 0:
-                return i + 1  # Include the comma
 
-        i += 1
-
-    return len(content)
-
-
-def validate_file(filepath: str, fix: bool = False, quiet: bool = False) -> tuple[bool, list[ValidationError], bool]:
+def member_span(content: str, key: int, comma: int) -> tuple[int, int]:
+    """
+    Span to delete for the object member starting at key and ending with
+    the comma at comma. A shadowed member is never the last in its object,
+    so its own comma always goes with it. Whole lines are removed when the
+    member has them to itself, along with a trailing // comment.
+    """
+    end = comma + 1
+    while end < len(content) and content[end] in ' \t':
+        end += 1
+    line_end = end
+    if content.startswith('//', line_end):
+        line_end = content.find('\n', line_end)
+    elif content.startswith('\r\n', line_end):
+        line_end += 1
+    line_start = content.rfind('\n', 0, key) + 1
+    if content.startswith('\n', line_end) and content[line_start:key].strip(' \t') == '':
+        return line_start, line_end + 1
+    return key, end
+
+
+def validate_file(filepath: str, fix: bool = False) -> tuple[bool, list[ValidationError], int]:
     """
     Validate a single JSON/JSONC file.
 
-    Returns: (is_valid, errors, was_fixed)
+    Returns: (is_valid, errors, number_of_duplicates_fixed)
     """
     path = Path(filepath)
 
     if not path.exists():
-        return False, [ValidationError("FILE_ERROR", f"File not found: {filepath}")], False
+        return False, [ValidationError("FILE_ERROR", f"File not found: {filepath}")], 0
 
     try:
         content = path.read_text(encoding='utf-8')
     except Exception as e:
-        return False, [ValidationError("FILE_ERROR", f"Cannot read file: {e}")], False
-
-    # Strip JSONC comments
-    stripped_content = strip_jsonc_comments(content)
+        return False, [ValidationError("FILE_ERROR", f"Cannot read file: {e}")], 0
 
-    # Check for syntax errors first
-    syntax_errors = validate_json_syntax(stripped_content, content)
-    if syntax_errors:
-        return False, syntax_errors, False
-
-    # Check for duplicate keys
-    duplicate_errors = check_duplicate_keys(content, stripped_content)
+    errors = validate_content(content)
+    if any(error.error_type == "SYNTAX_ERROR" for error in errors):
+        return False, errors, 0
+    duplicate_errors = errors
 
     if duplicate_errors and fix:
         fixed_content, num_fixed = fix_duplicate_keys(content)
         if num_fixed > 0:
             path.write_text(fixed_content, encoding='utf-8')
-            if not quiet:
-                print(f"  Fixed {num_fixed} duplicate key(s)")
-            return True, [], True
+            return True, [], num_fixed
 
     if duplicate_errors:
-        return False, duplicate_errors, False
+        return False, duplicate_errors, 0
+
+    return True, [], 0
 
-    return True, [], False
+
+def validate_files(files: list[str], fix: bool, jobs: int):
+    """
+    Yield validate_file results in the order of files.
+    Files are spread over a process pool when more than one job is allowed.
+    """
+    check = partial(validate_file, fix=fix)
+    jobs = min(jobs, len(files))
+    if jobs <= 1:
+        yield from map(check, files)
+        return
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        yield from executor.map(check, files, chunksize=max(1, len(files) // (jobs * 4)))
+
+
+class ValidationCache:
+    """
+    Fingerprints of files that last validated clean.
+    A file is skipped while its size, mtime and content hash all match;
+    every entry is dropped when this script changes.
+    """
+
+    def __init__(self, path: Optional[Path] = None):
+        cache_home = os.environ.get('XDG_CACHE_HOME') or Path.home() / '.cache'
+        self.path = path or Path(cache_home) / 'json-validator' / 'results.json'
+        self.version = hashlib.blake2b(Path(__file__).read_bytes(), digest_size=8).hexdigest()
+        self.entries: dict[str, list] = {}
+        try:
+            data = json.loads(self.path.read_text(encoding='utf-8'))
+            if data['version'] == self.version:
+                self.entries = data['files']
+        except (OSError, ValueError, KeyError, TypeError):
+            pass  # Missing or unreadable cache: start empty
+
+    @staticmethod
+    def fingerprint(filepath: str) -> Optional[list]:
+        """[size, mtime_ns, content hash] of a file, or None if it cannot be read"""
+        try:
+            with open(filepath, 'rb') as f:
+                stat = os.fstat(f.fileno())
+                digest = hashlib.blake2b(f.read(), digest_size=16).hexdigest()
+        except OSError:
+            return None
+        return [stat.st_size, stat.st_mtime_ns, digest]
+
+    def check(self, filepath: str) -> tuple[bool, Optional[list]]:
+        """Return (hit, fingerprint); the fingerprint is None if the file cannot be read"""
+        fingerprint = self.fingerprint(filepath)
+        hit = fingerprint is not None and self.entries.get(os.path.abspath(filepath)) == fingerprint
+        return hit, fingerprint
+
+    def store(self, filepath: str, fingerprint: list):
+        self.entries[os.path.abspath(filepath)] = fingerprint
+
+    def save(self):
+        """Write the cache atomically, forgetting files that no longer exist"""
+        files = {path: entry for path, entry in self.entries.items() if os.path.exists(path)}
+        tmp = self.path.with_name(f".{self.path.name}.{os.getpid()}")
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp.write_text(json.dumps({'version': self.version, 'files': files}), encoding='utf-8')
+            os.replace(tmp, self.path)
+        except OSError:
+            tmp.unlink(missing_ok=True)  # The cache is only an optimisation
 
 
 def main():
@@ -298,26 +440,48 @@ def main():
                        help='Only output errors')
     parser.add_argument('--json', action='store_true',
                        help='Output in JSON format')
+    parser.add_argument('-j', '--jobs', type=int, default=os.cpu_count() or 1,
+                       help='Files to validate in parallel (default: CPU count)')
+    parser.add_argument('--no-cache', action='store_true',
+                       help='Validate every file, ignoring and not updating the cache')
 
     args = parser.parse_args()
+    if args.jobs < 1:
+        parser.error('--jobs must be at least 1')
 
     results = {
         'files_checked': 0,
         'valid': 0,
         'errors': 0,
         'fixed': 0,
+        'cache_hits': 0,
+        'cache_misses': 0,
         'details': []
     }
 
-    for filepath in args.files:
+    cache = None if args.no_cache else ValidationCache()
+    checks = [cache.check(filepath) if cache else (False, None) for filepath in args.files]
+    pending = [filepath for filepath, (hit, _) in zip(args.files, checks) if not hit]
+    outcomes = validate_files(pending, args.fix, args.jobs)
+
+    for filepath, (hit, fingerprint) in zip(args.files, checks):
         results['files_checked'] += 1
+        if hit:
+            is_valid, errors, num_fixed = True, [], 0
+            results['cache_hits'] += 1
+        else:
+            is_valid, errors, num_fixed = next(outcomes)
+            results['cache_misses'] += 1
+            if cache and fingerprint and is_valid and not num_fixed:
+                cache.store(filepath, fingerprint)
+        was_fixed = num_fixed > 0
 
         if not args.quiet and not args.json:
             print(f"\nChecking: {filepath}")
 
-        is_valid, errors, was_fixed = validate_file(filepath, args.fix, args.quiet)
-
         if was_fixed:
+            if not args.quiet and not args.json:
+                print(f"  Fixed {num_fixed} duplicate key(s)")
             results['fixed'] += 1
             results['valid'] += 1
         elif is_valid:
@@ -344,6 +508,9 @@ def main():
             'errors': [str(e) for e in errors]
         })
 
+    if cache:
+        cache.save()
+
     # Summary
     if args.json:
         import json as json_out
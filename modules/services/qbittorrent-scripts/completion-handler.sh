@@ -22,6 +22,7 @@ LOG_FILE="/var/log/qbittorrent-completion.log"
 ORGANIZED_DIR="/mnt/torrents/organized"
 ENABLE_HARDLINKS="${QBITTORRENT_HARDLINKS:-true}"
 ENABLE_NOTIFICATIONS="${QBITTORRENT_NOTIFICATIONS:-true}"
+PLEX_MONITOR_INTAKE_DIR="${PLEX_MONITOR_INTAKE_DIR:-/var/lib/qbittorrent/completed.d}"
 
 # Extract parameters
 TORRENT_NAME="$1"
@@ -130,6 +131,23 @@ organize_files() {
     fi
 }
 
+# Notify plex-monitor-daemon.py so it processes the torrent immediately
+notify_plex_monitor() {
+    local hash="$1"
+
+    if [[ -z "$hash" || ! -d "$PLEX_MONITOR_INTAKE_DIR" ]]; then
+        return 0
+    fi
+
+    # Write to a hidden file first so the daemon only sees complete entries
+    local tmp_file="${PLEX_MONITOR_INTAKE_DIR}/.${hash}.tmp"
+    if printf '%s\n' "$hash" > "$tmp_file" && mv -f "$tmp_file" "${PLEX_MONITOR_INTAKE_DIR}/${hash}"; then
+        log "Queued for Plex monitor: $hash"
+    else
+        log "Failed to queue torrent for Plex monitor"
+    fi
+}
+
 # Extract media info for movies/TV shows
 extract_media_info() {
     local path="$1"
@@ -159,6 +177,9 @@ main() {
     log "Info hash: $INFO_HASH"
     log "=========================================="
 
+    # Hand the torrent to the Plex monitor daemon
+    notify_plex_monitor "$INFO_HASH"
+
     # Send completion notification
     if [[ "${ENABLE_NOTIFICATIONS}" == "true" ]]; then
         send_webhook \
@@ -0,0 +1,527 @@
+#!/usr/bin/env python3
+"""
+Plex Monitor Benchmark
+Runs plex-monitor-daemon.py end to end against local qBittorrent and Plex
+stand-ins and a synthetic download tree, and reports per-torrent processing
+time, disk operations and API calls.
+
+Usage:
+    plex-monitor-bench.py                    # default tree (~16k files)
+    plex-monitor-bench.py --json > run.json  # machine-readable report
+    plex-monitor-bench.py --daemon old.py    # benchmark another daemon revision
+
+Scenarios that rely on hooks an older revision lacks (plan_torrent,
+Backfill) are reported as skipped for it; process_torrent runs on every
+revision.
+"""
+
+import os
+import sys
+import json
+import time
+import fcntl
+import random
+import hashlib
+import argparse
+import contextlib
+import tempfile
+import threading
+import importlib.util
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, Optional
+from urllib.parse import urlsplit, parse_qs
+
+DAEMON_PATH = Path(__file__).with_name("plex-monitor-daemon.py")
+
+
+class TreeGenerator:
+    """
+    Synthetic download directory shaped like real torrents.
+    Files are empty (or sparse with --file-size), since linking cost does
+    not depend on file size.
+    """
+
+    def __init__(self, root: Path, file_size: int = 0, seed: int = 0):
+        self.root = root
+        self.file_size = file_size
+        self.random = random.Random(seed)
+        self.torrents: list = []
+        self.files: Dict[str, list] = {}
+
+    def _write(self, path: Path):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, 'wb') as f:
+            if self.file_size:
+                f.truncate(self.file_size)
+
+    def _add(self, kind: str, name: str, rel_files: list):
+        """Create the files of one torrent and register its API records"""
+        content_path = self.root / name
+        for rel in rel_files:
+            self._write(content_path / rel if rel else content_path)
+
+        hash_id = hashlib.sha1(name.encode()).hexdigest()
+        self.files[hash_id] = [
+            {'name': '/'.join(filter(None, [name, rel])), 'size': self.file_size,
+             'priority': 1, 'progress': 1.0}
+            for rel in rel_files
+        ]
+        self.torrents.append({
+            'hash': hash_id,
+            'name': name,
+            'kind': kind,
+            'content_path': str(content_path),
+            'save_path': str(self.root),
+            'progress': 1.0,
+            'state': 'uploading',
+            'eta': 8640000,
+            'size': self.file_size * len(rel_files),
+            'completion_on': int(time.time()) - self.random.randint(0, 86400),
+        })
+
+    def movie(self, index: int):
+        title = f"Bench Movie {index:04d} ({1980 + index % 45})"
+        if index % 2:
+            # Single-file torrent
+            self._add('movie', f"{title}.1080p.mkv", [''])
+        else:
+            self._add('movie', f"{title} 1080p BluRay",
+                      [f"{title}.mkv", f"{title}.en.srt", "Sample/sample.mkv"])
+
+    def season_pack(self, show: int, season: int, episodes: int):
+        name = f"Bench Show {show:03d} S{season:02d} 1080p WEB-DL"
+        self._add('season', name, [
+            f"Bench.Show.{show:03d}.S{season:02d}E{episode:02d}.1080p.mkv"
+            for episode in range(1, episodes + 1)
+        ])
+
+    def bluray(self, index: int, streams: int):
+        name = f"Bench Disc {index:03d} ({2000 + index % 25}) COMPLETE BLURAY"
+        rel_files = ["BDMV/index.bdmv", "BDMV/MovieObject.bdmv"]
+        rel_files += [f"BDMV/STREAM/{n:05d}.m2ts" for n in range(streams)]
+        rel_files += [f"BDMV/CLIPINF/{n:05d}.clpi" for n in range(streams)]
+        rel_files += [f"BDMV/PLAYLIST/{n:05d}.mpls" for n in range(streams // 6 + 1)]
+        self._add('bluray', name, rel_files)
+
+    def generate(self, movies: int, shows: int, seasons: int, episodes: int,
+                 discs: int, streams: int) -> int:
+        """Build the whole tree; returns the number of files created"""
+        for index in range(movies):
+            self.movie(index)
+        for show in range(shows):
+            for season in range(1, seasons + 1):
+                self.season_pack(show, season, episodes)
+        for index in range(discs):
+            self.bluray(index, streams)
+        self.random.shuffle(self.torrents)
+        return sum(len(files) for files in self.files.values())
+
+
+class StandInServer(ThreadingHTTPServer):
+    # The default listen backlog of 5 drops concurrent connects
+    request_queue_size = 128
+    daemon_threads = True
+
+
+class StandIn:
+    """Minimal HTTP server on a random localhost port that counts API calls"""
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.calls = Counter()
+        self.lock = threading.Lock()
+        stand_in = self
+
+        class Handler(BaseHTTPRequestHandler):
+            # Keep-alive like the real services; headers and body go out as
+            # separate writes, so Nagle would stall every response
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def do_GET(self):
+                stand_in.dispatch(self)
+
+            def do_POST(self):
+                stand_in.dispatch(self)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = StandInServer(("127.0.0.1", 0), Handler)
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def reset(self):
+        with self.lock:
+            self.calls.clear()
+
+    def dispatch(self, request: BaseHTTPRequestHandler):
+        url = urlsplit(request.path)
+        query = {k: v[0] for k, v in parse_qs(url.query).items()}
+        if self.latency:
+            time.sleep(self.latency)
+        status, body = self.handle(url.path, query)
+        with self.lock:
+            self.calls[self.endpoint(url.path, query)] += 1
+        data = body if isinstance(body, bytes) else json.dumps(body).encode()
+        request.send_response(status)
+        request.send_header("Content-Type", "application/json")
+        request.send_header("Content-Length", str(len(data)))
+        request.end_headers()
+        request.wfile.write(data)
+
+    def endpoint(self, path: str, query: Dict) -> str:
+        """Name calls are counted under"""
+        return path
+
+    def handle(self, path: str, query: Dict) -> tuple:
+        raise NotImplementedError
+
+
+class QBittorrentStandIn(StandIn):
+    """Serves the generated torrents through the qBittorrent Web API"""
+
+    def __init__(self, torrents: list, files: Dict[str, list], latency: float = 0.0):
+        super().__init__(latency)
+        self.torrents = {t['hash']: {k: v for k, v in t.items() if k != 'kind'} for t in torrents}
+        self.files = files
+
+    def handle(self, path: str, query: Dict) -> tuple:
+        if path == "/api/v2/auth/login":
+            return 200, b"Ok."
+        if path == "/api/v2/torrents/info":
+            return 200, list(self.torrents.values())
+        if path == "/api/v2/sync/maindata":
+            if query.get('rid', '0') == '0':
+                return 200, {'rid': 1, 'full_update': True, 'torrents': self.torrents}
+            return 200, {'rid': 1}
+        if path == "/api/v2/torrents/files":
+            files = self.files.get(query.get('hash', ''))
+            return (200, files) if files is not None else (404, b"Not Found")
+        return 404, b"Not Found"
+
+
+class PlexStandIn(StandIn):
+    """Accepts library section refreshes"""
+
+    def endpoint(self, path: str, query: Dict) -> str:
+        # Count refreshes per scope rather than per section id
+        if path.startswith("/library/sections/") and path.endswith("/refresh"):
+            return f"/library/sections/*/refresh ({'path' if 'path' in query else 'full'})"
+        return path
+
+    def handle(self, path: str, query: Dict) -> tuple:
+        if path.startswith("/library/sections/") and path.endswith("/refresh"):
+            return 200, b""
+        return 404, b"Not Found"
+
+
+class DiskOps:
+    """
+    Counts filesystem calls made through the os module while active.
+    os.makedirs is left alone because it goes through os.mkdir.
+    """
+
+    OS_CALLS = ('link', 'open', 'close', 'stat', 'lstat', 'scandir', 'mkdir', 'rename',
+                'unlink', 'utime', 'fsync', 'copy_file_range', 'sendfile')
+
+    def __init__(self):
+        self.counts = Counter()
+        self.lock = threading.Lock()
+        self.originals: Dict[tuple, object] = {}
+
+    def _wrap(self, module, name: str):
+        original = getattr(module, name, None)
+        if original is None:
+            return
+        self.originals[(module, name)] = original
+        counts, lock = self.counts, self.lock
+
+        def counted(*args, **kwargs):
+            with lock:
+                counts[name] += 1
+            return original(*args, **kwargs)
+
+        setattr(module, name, counted)
+
+    def __enter__(self):
+        for name in self.OS_CALLS:
+            self._wrap(os, name)
+        self._wrap(fcntl, 'ioctl')
+        return self
+
+    def __exit__(self, *exc):
+        for (module, name), original in self.originals.items():
+            setattr(module, name, original)
+        self.originals.clear()
+
+
+def load_daemon(path: Path, env: Dict[str, str]):
+    """Import the daemon script as a module with its configuration in env"""
+    os.environ.update(env)
+    spec = importlib.util.spec_from_file_location("plex_monitor_daemon", path)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[spec.name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def percentile(values: list, fraction: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def timing_summary(samples: list) -> Dict:
+    """Per-torrent timings in milliseconds"""
+    values = [seconds * 1000 for seconds in samples]
+    return {
+        'count': len(values),
+        'total_ms': round(sum(values), 2),
+        'mean_ms': round(sum(values) / len(values), 3) if values else 0.0,
+        'p50_ms': round(percentile(values, 0.50), 3),
+        'p95_ms': round(percentile(values, 0.95), 3),
+        'max_ms': round(max(values, default=0.0), 3),
+    }
+
+
+class Benchmark:
+    """Runs each scenario against a fresh library and collects its report"""
+
+    def __init__(self, daemon, workdir: Path, tree: TreeGenerator,
+                 qbittorrent: QBittorrentStandIn, plex: PlexStandIn):
+        self.daemon = daemon
+        self.workdir = workdir
+        self.tree = tree
+        self.qbittorrent = qbittorrent
+        self.plex = plex
+        self.runs = 0
+
+    def fresh_monitor(self):
+        """PlexMonitor with an empty library, state store and library index"""
+        self.runs += 1
+        run_dir = self.workdir / f"run-{self.runs}"
+        daemon = self.daemon
+        daemon.MOVIES_DIR = run_dir / "plex" / "Movies"
+        daemon.TV_DIR = run_dir / "plex" / "TV Shows"
+        daemon.STATE_DB = run_dir / "state.db"
+        daemon.STATE_FILE = run_dir / "processed_torrents.json"
+        # Older revisions read the token from a fixed path and have no index
+        daemon.PLEX_TOKEN_FILE = os.environ['PLEX_TOKEN_FILE']
+        if getattr(daemon, 'LIBRARY_INDEX_DB', None):
+            daemon.LIBRARY_INDEX_DB = str(run_dir / "library-index.db")
+        daemon.MOVIES_DIR.mkdir(parents=True)
+        daemon.TV_DIR.mkdir(parents=True)
+        return daemon.PlexMonitor()
+
+    def supports(self, name: str) -> Optional[str]:
+        """Why the daemon under test cannot run a scenario, None if it can"""
+        needs = {'relink': ('PlexMonitor.plan_torrent', 'PlexMonitor.link_job'),
+                 'backlog': ('Backfill',)}
+        for hook in needs.get(name, ()):
+            owner, _, attr = hook.rpartition('.')
+            target = getattr(self.daemon, owner) if owner else self.daemon
+            if not hasattr(target, attr):
+                return f"daemon has no {hook}"
+        return None
+
+    def measure(self, name: str, body, prepare=None) -> Dict:
+        """
+        Run body(monitor, samples, prepared) and collect timings, disk ops
+        and API calls. prepare(monitor) runs first and is not measured.
+        """
+        monitor = self.fresh_monitor()
+        samples = []
+        try:
+            prepared = prepare(monitor) if prepare else None
+            self.qbittorrent.reset()
+            self.plex.reset()
+            with DiskOps() as disk:
+                started = time.perf_counter()
+                body(monitor, samples, prepared)
+                elapsed = time.perf_counter() - started
+        finally:
+            if hasattr(monitor, 'close'):
+                monitor.close()
+
+        torrents = len(self.tree.torrents)
+        files = sum(len(f) for f in self.tree.files.values())
+        report = {
+            'scenario': name,
+            'wall_seconds': round(elapsed, 3),
+            'torrents_per_second': round(torrents / elapsed, 1) if elapsed else 0.0,
+            'files_per_second': round(files / elapsed, 1) if elapsed else 0.0,
+            'disk_ops': dict(disk.counts.most_common()),
+            'disk_ops_per_torrent': round(sum(disk.counts.values()) / torrents, 1),
+            'api_calls': dict(self.qbittorrent.calls + self.plex.calls),
+        }
+        if samples:
+            report['per_torrent'] = timing_summary([seconds for _, seconds in samples])
+            kinds = {}
+            for kind, seconds in samples:
+                kinds.setdefault(kind, []).append(seconds)
+            report['per_kind'] = {kind: timing_summary(v) for kind, v in sorted(kinds.items())}
+        return report
+
+    def process_torrent(self, monitor, samples: list, prepared=None):
+        """Sequential process_torrent for every torrent, as the daemon did originally"""
+        # Revisions before the metadata classifier take the torrent alone
+        fetch = getattr(monitor, 'fetch_file_list', None)
+        for torrent in self.tree.torrents:
+            args = (torrent, fetch(torrent['hash'])) if fetch else (torrent,)
+            started = time.perf_counter()
+            monitor.process_torrent(*args)
+            samples.append((torrent['kind'], time.perf_counter() - started))
+        if hasattr(monitor, 'refresher'):
+            monitor.refresher.flush_due(force=True)
+
+    def prepare_relink(self, monitor) -> list:
+        """Plan every torrent and populate the library with its files"""
+        jobs = []
+        for torrent in self.tree.torrents:
+            job = monitor.plan_torrent(torrent, self.tree.files[torrent['hash']])
+            if job is not None:
+                monitor.link_job(job)
+                jobs.append((torrent['kind'], job))
+        return jobs
+
+    def relink(self, monitor, samples: list, jobs: list):
+        """create_hardlink into a library that already holds every file"""
+        for kind, job in jobs:
+            started = time.perf_counter()
+            monitor.create_hardlink(job.source, job.library_dir, job.show_name,
+                                    job.season, job.snapshot)
+            samples.append((kind, time.perf_counter() - started))
+
+    def backlog(self, monitor, samples: list, prepared=None):
+        """Full sync, metadata fetch and parallel linking of the whole backlog"""
+        self.daemon.Backfill(monitor).run()
+
+    def run(self, scenarios: list) -> list:
+        reports = []
+        for name in scenarios:
+            reason = self.supports(name)
+            if reason:
+                reports.append({'scenario': name, 'skipped': reason})
+                continue
+            reports.append(self.measure(name, getattr(self, name),
+                                        getattr(self, f"prepare_{name}", None)))
+        return reports
+
+
+SCENARIOS = ('process_torrent', 'relink', 'backlog')
+
+
+def print_report(tree_stats: Dict, reports: list):
+    print(f"Tree: {tree_stats['torrents']} torrents, {tree_stats['files']} files "
+          f"(generated in {tree_stats['seconds']}s)")
+    for report in reports:
+        print()
+        print(f"== {report['scenario']} ==")
+        if 'skipped' in report:
+            print(f"  skipped: {report['skipped']}")
+            continue
+        print(f"  wall: {report['wall_seconds']}s  "
+              f"({report['torrents_per_second']} torrents/s, {report['files_per_second']} files/s)")
+        if 'per_torrent' in report:
+            for kind, summary in [('all', report['per_torrent'])] + list(report['per_kind'].items()):
+                print(f"  {kind:<8} n={summary['count']:<5} mean={summary['mean_ms']}ms "
+                      f"p50={summary['p50_ms']}ms p95={summary['p95_ms']}ms max={summary['max_ms']}ms")
+        ops = ', '.join(f"{name}={count}" for name, count in report['disk_ops'].items())
+        print(f"  disk ops ({report['disk_ops_per_torrent']}/torrent): {ops}")
+        calls = ', '.join(f"{name}={count}" for name, count in sorted(report['api_calls'].items()))
+        print(f"  api calls: {calls or 'none'}")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        description="Benchmark plex-monitor-daemon.py against local qBittorrent and Plex stand-ins"
+    )
+    parser.add_argument("--daemon", type=Path, default=DAEMON_PATH,
+                        help="Daemon script to benchmark (default: next to this script)")
+    parser.add_argument("--workdir", type=Path, default=None,
+                        help="Keep the synthetic tree and runs in a new subdirectory of this "
+                             "directory (default: a temporary directory)")
+    parser.add_argument("--movies", type=int, default=200, help="Movie torrents (default: 200)")
+    parser.add_argument("--shows", type=int, default=40, help="Shows (default: 40)")
+    parser.add_argument("--seasons", type=int, default=3, help="Season packs per show (default: 3)")
+    parser.add_argument("--episodes", type=int, default=24, help="Episodes per season (default: 24)")
+    parser.add_argument("--discs", type=int, default=20, help="Blu-ray folder torrents (default: 20)")
+    parser.add_argument("--streams", type=int, default=300,
+                        help="STREAM/CLIPINF entries per Blu-ray (default: 300)")
+    parser.add_argument("--file-size", type=int, default=0,
+                        help="Sparse size of each generated file in bytes (default: 0)")
+    parser.add_argument("--latency", type=float, default=0.0,
+                        help="Simulated API latency per request in milliseconds")
+    parser.add_argument("--scenario", action="append", choices=SCENARIOS,
+                        help="Scenario to run, repeatable (default: all)")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    parser.add_argument("--verbose", action="store_true", help="Show daemon log output")
+    args = parser.parse_args()
+
+    if args.workdir:
+        # A fresh subdirectory per invocation, so a workdir can be reused
+        args.workdir.mkdir(parents=True, exist_ok=True)
+        workspace = contextlib.nullcontext(tempfile.mkdtemp(prefix="plex-monitor-bench-", dir=args.workdir))
+    else:
+        workspace = tempfile.TemporaryDirectory(prefix="plex-monitor-bench-")
+    with workspace as tmp:
+        workdir = Path(tmp)
+        if args.workdir:
+            print(f"Working in {workdir}", file=sys.stderr)
+
+        started = time.perf_counter()
+        tree = TreeGenerator(workdir / "downloads", args.file_size)
+        file_count = tree.generate(args.movies, args.shows, args.seasons, args.episodes,
+                                   args.discs, args.streams)
+        tree_stats = {'torrents': len(tree.torrents), 'files': file_count,
+                      'seconds': round(time.perf_counter() - started, 2)}
+
+        latency = args.latency / 1000
+        qbittorrent = QBittorrentStandIn(tree.torrents, tree.files, latency).start()
+        plex = PlexStandIn(latency).start()
+        token_file = workdir / "plex-token"
+        token_file.write_text("bench-token\n")
+
+        daemon = load_daemon(args.daemon, {
+            'QBITTORRENT_URL': qbittorrent.url,
+            'PLEX_URL': plex.url,
+            'PLEX_TOKEN_FILE': str(token_file),
+            # No log file: its rotation checks would show up in the disk op counts
+            'LOG_FILE': "",
+            'INTAKE_DIR': str(workdir / "completed.d"),
+            'METRICS_PORT': "0",
+            'PLEX_REFRESH_DELAY': "0",
+            'LOG_CONSOLE': "1" if args.verbose else "0",
+        })
+
+        try:
+            benchmark = Benchmark(daemon, workdir, tree, qbittorrent, plex)
+            reports = benchmark.run(args.scenario or list(SCENARIOS))
+        finally:
+            qbittorrent.stop()
+            plex.stop()
+
+    if args.json:
+        print(json.dumps({'tree': tree_stats, 'scenarios': reports}, indent=2))
+    else:
+        print_report(tree_stats, reports)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -6,68 +6,1944 @@ creates hardlinks in Plex media directories.
 """
 
 import os
+import re
 import sys
 import time
+import signal
+import asyncio
+import argparse
 import json
+import stat
+import errno
+import fcntl
+import ctypes
+import copy
+import queue
+import atexit
+import heapq
+import sqlite3
 import logging
+import functools
+import contextvars
+import logging.handlers
+import threading
+import contextlib
 import subprocess
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from collections import OrderedDict, deque
 from pathlib import Path
-from typing import Dict, Set, Optional
+from typing import Dict, Set, Optional, NamedTuple, Iterable
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 # Configuration
 QBITTORRENT_URL = os.getenv("QBITTORRENT_URL", "http://localhost:8080")
 PLEX_URL = os.getenv("PLEX_URL", "http://localhost:32400")
-PLEX_TOKEN_FILE = "/etc/plex/token"
+PLEX_TOKEN_FILE = os.getenv("PLEX_TOKEN_FILE", "/etc/plex/token")
 PLEX_MOVIES_SECTION = os.getenv("PLEX_MOVIES_SECTION", "1")
 PLEX_TV_SECTION = os.getenv("PLEX_TV_SECTION", "2")
 
 # Paths
-MOVIES_DIR = Path("/mnt/torrents/plex/Movies")
-TV_DIR = Path("/mnt/torrents/plex/TV Shows")
-STATE_FILE = Path("/var/lib/qbittorrent/processed_torrents.json")
-LOG_FILE = "/var/log/plex-monitor.log"
+MOVIES_DIR = Path(os.getenv("MOVIES_DIR", "/mnt/torrents/plex/Movies"))
+TV_DIR = Path(os.getenv("TV_DIR", "/mnt/torrents/plex/TV Shows"))
+STATE_FILE = Path(os.getenv("STATE_FILE", "/var/lib/qbittorrent/processed_torrents.json"))
+STATE_DB = Path(os.getenv("STATE_DB", "/var/lib/qbittorrent/plex-monitor.db"))
+# Processed state backend: "sqlite" (STATE_DB) or "json" (STATE_FILE)
+STATE_BACKEND = os.getenv("STATE_BACKEND", "sqlite")
+# Processed hashes of torrents removed from qBittorrent are forgotten after
+# this many days; the reconciliation pass runs every STATE_GC_INTERVAL seconds
+STATE_RETENTION_DAYS = float(os.getenv("STATE_RETENTION_DAYS", "30"))
+STATE_GC_INTERVAL = int(os.getenv("STATE_GC_INTERVAL", "86400"))
+LOG_FILE = os.getenv("LOG_FILE", "/var/log/plex-monitor/plex-monitor.log")
+
+# Persistent (st_dev, st_ino) index of the Plex library ("" disables it)
+LIBRARY_INDEX_DB = os.getenv("LIBRARY_INDEX_DB", "/var/lib/qbittorrent/plex-library-index.db")
+
+# Spool directory the completion hook drops torrent hashes into
+INTAKE_DIR = Path(os.getenv("INTAKE_DIR", "/var/lib/qbittorrent/completed.d"))
+
+# Where classification reads the file list from: "metadata" uses
+# qBittorrent's /api/v2/torrents/files, "disk" scans content_path
+CLASSIFY_SOURCE = os.getenv("CLASSIFY_SOURCE", "metadata")
+
+# Plex refresh coalescing: requests for a section are batched until no new
+# request arrived for PLEX_REFRESH_DELAY seconds (or 5x that since the first)
+PLEX_REFRESH_DELAY = float(os.getenv("PLEX_REFRESH_DELAY", "10"))
+# Above this many changed folders a single full section scan is cheaper
+PLEX_REFRESH_MAX_PATHS = int(os.getenv("PLEX_REFRESH_MAX_PATHS", "8"))
+
+# What to do when the library is on another filesystem than the download:
+# "copy" tries a reflink and then an in-kernel copy, "reflink" only tries
+# a reflink, "none" gives up like a failed hardlink
+CROSS_DEVICE_FALLBACK = os.getenv("CROSS_DEVICE_FALLBACK", "copy")
+COPY_CHUNK_SIZE = int(os.getenv("COPY_CHUNK_MB", "64")) * 1024 * 1024
+
+# Number of torrents linked concurrently
+LINK_WORKERS = int(os.getenv("LINK_WORKERS", "4"))
+
+# Order of the link backlog: "completion" (oldest first), "size" (smallest
+# first) or "category" (QUEUE_CATEGORIES order, then oldest first). A job
+# that waited QUEUE_MAX_WAIT seconds runs next regardless of its priority.
+QUEUE_ORDER = os.getenv("QUEUE_ORDER", "completion")
+QUEUE_CATEGORIES = [c.strip() for c in os.getenv("QUEUE_CATEGORIES", "").split(",") if c.strip()]
+QUEUE_MAX_WAIT = float(os.getenv("QUEUE_MAX_WAIT", "600"))
+
+# Classifier result cache (number of distinct names)
+CLASSIFIER_CACHE_SIZE = int(os.getenv("CLASSIFIER_CACHE_SIZE", "8192"))
+
+# Prometheus /metrics endpoint (port 0 disables it)
+METRICS_ADDR = os.getenv("METRICS_ADDR", "127.0.0.1")
+METRICS_PORT = int(os.getenv("METRICS_PORT", "9561"))
+
+# qBittorrent WebUI credentials; leave the username empty when the WebUI
+# bypasses authentication for localhost
+QBITTORRENT_USERNAME = os.getenv("QBITTORRENT_USERNAME", "")
+QBITTORRENT_PASSWORD_FILE = os.getenv("QBITTORRENT_PASSWORD_FILE", "")
+
+# Per-request HTTP timeouts (seconds)
+QBITTORRENT_TIMEOUT = float(os.getenv("QBITTORRENT_TIMEOUT", "30"))
+PLEX_TIMEOUT = float(os.getenv("PLEX_TIMEOUT", "10"))
+# Keep-alive connections per service and retries for idempotent requests
+# that fail to connect or get a 502/503/504
+HTTP_POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", "16"))
+HTTP_RETRIES = int(os.getenv("HTTP_RETRIES", "2"))
+# After BREAKER_THRESHOLD consecutive failures a service is left alone for
+# BREAKER_BACKOFF seconds, doubling per failed probe up to BREAKER_MAX_BACKOFF
+BREAKER_THRESHOLD = int(os.getenv("BREAKER_THRESHOLD", "5"))
+BREAKER_BACKOFF = float(os.getenv("BREAKER_BACKOFF", "5"))
+BREAKER_MAX_BACKOFF = float(os.getenv("BREAKER_MAX_BACKOFF", "300"))
+# How long shutdown waits for running link jobs
+SHUTDOWN_TIMEOUT = float(os.getenv("SHUTDOWN_TIMEOUT", "60"))
+
+# Logging: records are handed to a background thread that writes LOG_FILE
+# (rotated at LOG_MAX_MB, keeping LOG_BACKUP_COUNT files) and stdout.
+# Rotation renames files, so LOG_FILE's directory must be writable.
+# LOG_FORMAT "json" writes one JSON object per line with torrent fields.
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.getenv("LOG_FORMAT", "text")
+LOG_MAX_BYTES = int(os.getenv("LOG_MAX_MB", "50")) * 1024 * 1024
+LOG_BACKUP_COUNT = int(os.getenv("LOG_BACKUP_COUNT", "5"))
+LOG_CONSOLE = os.getenv("LOG_CONSOLE", "1") != "0"
 
 # Polling interval
 POLL_INTERVAL = int(os.getenv("POLL_INTERVAL", "30"))  # seconds
-
-# Setup logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='[%(asctime)s] %(levelname)s: %(message)s',
-    handlers=[
-        logging.FileHandler(LOG_FILE),
-        logging.StreamHandler(sys.stdout)
-    ]
-)
+# Reconciliation interval used while the completion hook intake is active
+RECONCILE_INTERVAL = int(os.getenv("RECONCILE_INTERVAL", "300"))  # seconds
+# Adaptive polling bounds: polls tighten to POLL_MIN_INTERVAL around expected
+# completions and back off up to POLL_MAX_INTERVAL while nothing downloads
+POLL_MIN_INTERVAL = float(os.getenv("POLL_MIN_INTERVAL", "2"))  # seconds
+POLL_MAX_INTERVAL = float(os.getenv("POLL_MAX_INTERVAL", "300"))  # seconds
+# How long before a torrent's ETA the next poll is scheduled
+POLL_LEAD = float(os.getenv("POLL_LEAD", "2"))  # seconds
+
+# Torrent fields attached to every record logged inside log_context()
+LOG_CONTEXT: contextvars.ContextVar = contextvars.ContextVar("log_context", default={})
+
+
+@contextlib.contextmanager
+def log_context(**fields):
+    """Tag records logged in this block (and this thread) with fields"""
+    token = LOG_CONTEXT.set({**LOG_CONTEXT.get(), **fields})
+    try:
+        yield
+    finally:
+        LOG_CONTEXT.reset(token)
+
+
+class ContextFilter(logging.Filter):
+    """Copies the current log context onto records in the emitting thread"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        context = LOG_CONTEXT.get()
+        record.torrent_hash = context.get('hash', '')
+        record.torrent = context.get('torrent', '')
+        record.stage = context.get('stage', '')
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'ts': self.formatTime(record, '%Y-%m-%dT%H:%M:%S') + f".{int(record.msecs):03d}",
+            'level': record.levelname,
+            'message': record.getMessage(),
+        }
+        for field in ('torrent_hash', 'torrent', 'stage'):
+            value = getattr(record, field, '')
+            if value:
+                entry[field] = value
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False)
+
+
+class RecordQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler that leaves formatting to the listener's handlers.
+    The stock prepare() folds the traceback into msg and clears exc_info,
+    which would hide exceptions from JsonFormatter.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        # Freeze the message now; args may be mutated after the call returns
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+
+def setup_logging() -> logging.handlers.QueueListener:
+    """
+    Route all logging through a queue so callers never wait on file or
+    console I/O; a listener thread does the writing.
+    """
+    if LOG_FORMAT == "json":
+        formatter = JsonFormatter()
+    else:
+        formatter = logging.Formatter('[%(asctime)s] %(levelname)s: %(message)s')
+
+    handlers = []
+    if LOG_FILE:
+        handlers.append(logging.handlers.RotatingFileHandler(
+            LOG_FILE, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUP_COUNT
+        ))
+    if LOG_CONSOLE:
+        handlers.append(logging.StreamHandler(sys.stdout))
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    log_queue = queue.SimpleQueue()
+    queue_handler = RecordQueueHandler(log_queue)
+    queue_handler.addFilter(ContextFilter())
+    root = logging.getLogger()
+    root.setLevel(LOG_LEVEL)
+    root.addHandler(queue_handler)
+
+    listener = logging.handlers.QueueListener(log_queue, *handlers)
+    listener.start()
+    # Drain the queue before the interpreter exits
+    atexit.register(listener.stop)
+    return listener
+
+
+LOG_LISTENER = setup_logging()
 logger = logging.getLogger(__name__)
 
 
-class PlexMonitor:
+class Metric:
+    """Base for a Prometheus metric family with optional labels"""
+
+    TYPE = "untyped"
+
+    def __init__(self, name: str, documentation: str, labels: tuple = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self.lock = threading.Lock()
+
+    def _key(self, labels: Dict) -> tuple:
+        return tuple(str(labels.get(label, '')) for label in self.labels)
+
+    def _format_labels(self, key: tuple, extra: str = '') -> str:
+        parts = [f'{label}="{value}"' for label, value in zip(self.labels, key)]
+        if extra:
+            parts.append(extra)
+        return '{' + ','.join(parts) + '}' if parts else ''
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.TYPE}"]
+        with self.lock:
+            lines.extend(self._samples())
+        return lines
+
+    def _samples(self) -> list:
+        raise NotImplementedError
+
+
+class Counter(Metric):
+    TYPE = "counter"
+
+    def __init__(self, name: str, documentation: str, labels: tuple = ()):
+        super().__init__(name, documentation, labels)
+        self.values: Dict[tuple, float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def _samples(self) -> list:
+        return [f"{self.name}{self._format_labels(k)} {v}" for k, v in self.values.items()]
+
+
+class Gauge(Metric):
+    TYPE = "gauge"
+
+    def __init__(self, name: str, documentation: str, labels: tuple = (), function=None):
+        super().__init__(name, documentation, labels)
+        self.values: Dict[tuple, float] = {}
+        self.function = function  # Evaluated at scrape time when set
+
+    def set(self, value: float, **labels):
+        with self.lock:
+            self.values[self._key(labels)] = value
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+    def _samples(self) -> list:
+        if self.function is not None:
+            try:
+                return [f"{self.name} {self.function()}"]
+            except Exception:
+                return []
+        return [f"{self.name}{self._format_labels(k)} {v}" for k, v in self.values.items()]
+
+
+class Histogram(Metric):
+    TYPE = "histogram"
+    DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300)
+
+    def __init__(self, name: str, documentation: str, labels: tuple = (), buckets: tuple = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labels)
+        self.buckets = buckets
+        self.values: Dict[tuple, list] = {}  # {key: [bucket counts..., sum, count]}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self.lock:
+            entry = self.values.get(key)
+            if entry is None:
+                entry = self.values[key] = [0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    entry[i] += 1
+            entry[-2] += value
+            entry[-1] += 1
+
+    @contextlib.contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def _samples(self) -> list:
+        lines = []
+        for key, entry in self.values.items():
+            for bound, count in zip(self.buckets, entry):
+                le = self._format_labels(key, 'le="%s"' % bound)
+                lines.append(f"{self.name}_bucket{le} {count}")
+            le = self._format_labels(key, 'le="+Inf"')
+            lines.append(f"{self.name}_bucket{le} {entry[-1]}")
+            lines.append(f"{self.name}_sum{self._format_labels(key)} {entry[-2]}")
+            lines.append(f"{self.name}_count{self._format_labels(key)} {entry[-1]}")
+        return lines
+
+
+class MetricsRegistry:
+    """Collection of metrics rendered in the Prometheus text format"""
+
     def __init__(self):
-        self.processed_hashes: Set[str] = self.load_state()
-        self.plex_token: Optional[str] = self.load_plex_token()
+        self.metrics: list = []
+
+    def register(self, metric: Metric) -> Metric:
+        self.metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+METRICS = MetricsRegistry()
+SYNC_SECONDS = METRICS.register(Histogram(
+    "plex_monitor_sync_duration_seconds", "qBittorrent sync/maindata request latency"))
+POLL_SECONDS = METRICS.register(Histogram(
+    "plex_monitor_poll_duration_seconds", "Duration of a full completion check"))
+STAGE_SECONDS = METRICS.register(Histogram(
+    "plex_monitor_stage_duration_seconds", "Per-stage torrent processing time", ("stage",)))
+HARDLINK_SECONDS = METRICS.register(Histogram(
+    "plex_monitor_hardlink_duration_seconds", "create_hardlink duration", ("library",)))
+HARDLINK_FILES = METRICS.register(Counter(
+    "plex_monitor_hardlink_files_total", "Library files by link result", ("library", "result")))
+QUEUE_WAIT = METRICS.register(Histogram(
+    "plex_monitor_queue_wait_seconds", "Time a classified torrent waited for a link worker",
+    buckets=(0.1, 1, 5, 15, 30, 60, 300, 600, 1800, 3600)))
+COMPLETION_LATENCY = METRICS.register(Histogram(
+    "plex_monitor_completion_to_library_seconds", "Time from torrent completion to linked in library",
+    buckets=(1, 5, 10, 30, 60, 120, 300, 600, 1800, 3600)))
+TORRENTS_PROCESSED = METRICS.register(Counter(
+    "plex_monitor_torrents_processed_total", "Processed torrents by outcome", ("media_type", "result")))
+PLEX_REFRESHES = METRICS.register(Counter(
+    "plex_monitor_plex_refresh_total", "Plex library refresh requests", ("library", "scope")))
+PLEX_REFRESH_ERRORS = METRICS.register(Counter(
+    "plex_monitor_plex_refresh_errors_total", "Failed Plex library refresh requests", ("library",)))
+POLL_INTERVAL_GAUGE = METRICS.register(Gauge(
+    "plex_monitor_poll_interval_seconds", "Delay chosen before the next qBittorrent sync"))
+BACKLOG_DEPTH = METRICS.register(Gauge(
+    "plex_monitor_backlog_depth", "Torrents waiting for or running in the link stage"))
+HTTP_REQUESTS = METRICS.register(Counter(
+    "plex_monitor_http_requests_total", "API requests by service and outcome", ("service", "outcome")))
+BREAKER_OPEN = METRICS.register(Gauge(
+    "plex_monitor_circuit_open", "1 while requests to a service are suspended", ("service",)))
+# Evaluated at scrape time; PlexMonitor supplies the functions
+STATE_HASHES = METRICS.register(Gauge(
+    "plex_monitor_state_hashes", "Processed hashes held in memory", function=lambda: 0))
+STATE_DISK_BYTES = METRICS.register(Gauge(
+    "plex_monitor_state_disk_bytes", "Processed state size on disk", function=lambda: 0))
+TORRENTS_TRACKED = METRICS.register(Gauge(
+    "plex_monitor_torrents_tracked", "Torrents in the sync table", function=lambda: 0))
+
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    """Serves METRICS on /metrics"""
+
+    def do_GET(self):
+        if self.path.split('?', 1)[0] != '/metrics':
+            self.send_error(404)
+            return
+        body = METRICS.render().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_metrics_server() -> Optional[ThreadingHTTPServer]:
+    """Start the /metrics endpoint on a background thread"""
+    if METRICS_PORT == 0:
+        return None
+    try:
+        server = ThreadingHTTPServer((METRICS_ADDR, METRICS_PORT), MetricsHandler)
+    except OSError as e:
+        logger.warning(f"Metrics endpoint disabled: {e}")
+        return None
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics", daemon=True).start()
+    return server
+
+
+class ServiceUnavailable(Exception):
+    """Raised without a request while a service's circuit breaker is open"""
+
+
+class CircuitBreaker:
+    """
+    Stops calling a failing service for a growing backoff.
+    After threshold consecutive failures the circuit opens; once the backoff
+    expires one probe request is let through, which closes the circuit on
+    success or doubles the backoff on failure.
+    """
+
+    def __init__(self, name: str, threshold: int = BREAKER_THRESHOLD,
+                 backoff: float = BREAKER_BACKOFF, max_backoff: float = BREAKER_MAX_BACKOFF):
+        self.name = name
+        self.threshold = max(1, threshold)
+        self.base_backoff = backoff
+        self.max_backoff = max_backoff
+        self.failures = 0
+        self.backoff = backoff
+        self.open_until = 0.0
+        self.probing = False
+        self.lock = threading.Lock()
+
+    def remaining(self) -> float:
+        """Seconds until requests are allowed again (0 when closed)"""
+        with self.lock:
+            if self.failures < self.threshold:
+                return 0.0
+            return max(0.0, self.open_until - time.monotonic())
+
+    def allow(self):
+        """Raise ServiceUnavailable unless a request may be sent now"""
+        with self.lock:
+            if self.failures < self.threshold:
+                return
+            if self.probing or time.monotonic() < self.open_until:
+                raise ServiceUnavailable(
+                    f"{self.name} unavailable, retrying in {max(0.0, self.open_until - time.monotonic()):.0f}s"
+                )
+            self.probing = True
+
+    def success(self):
+        with self.lock:
+            if self.failures >= self.threshold:
+                logger.info(f"✅ {self.name} reachable again")
+                BREAKER_OPEN.set(0, service=self.name)
+            self.failures = 0
+            self.backoff = self.base_backoff
+            self.probing = False
+
+    def failure(self, error: Exception):
+        with self.lock:
+            self.failures += 1
+            if self.failures < self.threshold:
+                return
+            if self.probing:
+                self.backoff = min(self.backoff * 2, self.max_backoff)
+            else:
+                logger.error(f"{self.name} unavailable after {self.failures} failures: {error}")
+                BREAKER_OPEN.set(1, service=self.name)
+            self.probing = False
+            self.open_until = time.monotonic() + self.backoff
+            logger.warning(f"Suspending {self.name} requests for {self.backoff:.0f}s")
+
+
+class ServiceClient:
+    """
+    Keep-alive HTTP session for one service with timeouts, bounded retries
+    of idempotent requests and a circuit breaker. Connection errors,
+    timeouts and 5xx responses count as failures.
+    """
+
+    RETRY_STATUSES = (502, 503, 504)
+
+    def __init__(self, name: str, base_url: str, timeout: float):
+        self.name = name
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        self.breaker = CircuitBreaker(name)
         self.session = requests.Session()
+        retry = Retry(total=HTTP_RETRIES, connect=HTTP_RETRIES, read=0,
+                      status_forcelist=self.RETRY_STATUSES, allowed_methods=("GET",),
+                      backoff_factor=0.5, raise_on_status=False)
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=HTTP_POOL_SIZE, max_retries=retry)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    @property
+    def deadline(self) -> float:
+        """Upper bound for one call including retries"""
+        return self.timeout * (HTTP_RETRIES + 1) + HTTP_RETRIES * 2
+
+    def request(self, method: str, path: str, **kwargs) -> requests.Response:
+        self.breaker.allow()
+        kwargs.setdefault('timeout', self.timeout)
+        try:
+            response = self.session.request(method, f"{self.base_url}{path}", **kwargs)
+        except Exception as e:
+            HTTP_REQUESTS.inc(service=self.name, outcome='error')
+            self.breaker.failure(e)
+            raise
+        if response.status_code >= 500:
+            HTTP_REQUESTS.inc(service=self.name, outcome='error')
+            self.breaker.failure(requests.HTTPError(f"HTTP {response.status_code}"))
+        else:
+            HTTP_REQUESTS.inc(service=self.name, outcome='ok')
+            self.breaker.success()
+        return response
 
-    def load_state(self) -> Set[str]:
-        """Load previously processed torrent hashes"""
-        if STATE_FILE.exists():
+    def get(self, path: str, **kwargs) -> requests.Response:
+        return self.request("GET", path, **kwargs)
+
+
+class QBittorrentClient(ServiceClient):
+    """qBittorrent Web API client that logs in once and again when the SID expires"""
+
+    def __init__(self, base_url: Optional[str] = None, username: Optional[str] = None,
+                 password_file: Optional[str] = None):
+        super().__init__("qBittorrent", base_url or QBITTORRENT_URL, QBITTORRENT_TIMEOUT)
+        self.username = QBITTORRENT_USERNAME if username is None else username
+        self.password_file = password_file or QBITTORRENT_PASSWORD_FILE
+        # The WebUI rejects API calls whose Referer does not match its host
+        self.session.headers['Referer'] = self.base_url
+        self.login_lock = threading.Lock()
+
+    def login(self):
+        """Obtain a fresh SID cookie"""
+        try:
+            with open(self.password_file, 'r') as f:
+                password = f.read().strip()
+        except OSError as e:
+            raise requests.HTTPError(f"cannot read qBittorrent password: {e}")
+        response = self.request("POST", "/api/v2/auth/login",
+                                data={'username': self.username, 'password': password})
+        if response.status_code != 200 or response.text.strip() != "Ok.":
+            raise requests.HTTPError(f"qBittorrent login failed: HTTP {response.status_code} "
+                                     f"{response.text.strip()}")
+        logger.info("Logged in to qBittorrent")
+
+    def get(self, path: str, **kwargs) -> requests.Response:
+        sid = self.session.cookies.get('SID')
+        response = super().get(path, **kwargs)
+        if response.status_code == 403 and self.username:
+            with self.login_lock:
+                # Another thread may have logged in meanwhile
+                if self.session.cookies.get('SID') == sid:
+                    self.login()
+            response = super().get(path, **kwargs)
+        return response
+
+    def maindata(self, rid: int) -> Dict:
+        response = self.get("/api/v2/sync/maindata", params={'rid': rid})
+        response.raise_for_status()
+        return response.json()
+
+    def torrent_files(self, hash_id: str) -> list:
+        response = self.get("/api/v2/torrents/files", params={'hash': hash_id})
+        response.raise_for_status()
+        return response.json()
+
+
+class PlexClient(ServiceClient):
+    """Plex Media Server client authenticated with the X-Plex-Token header"""
+
+    def __init__(self, base_url: Optional[str] = None, token: Optional[str] = None):
+        super().__init__("Plex", base_url or PLEX_URL, PLEX_TIMEOUT)
+        self.token = token
+        if token:
+            # Keeps the token out of URLs and therefore out of error messages
+            self.session.headers['X-Plex-Token'] = token
+
+    def refresh(self, section_id: str, path: Optional[Path] = None) -> requests.Response:
+        params = {'path': str(path)} if path is not None else None
+        return self.get(f"/library/sections/{section_id}/refresh", params=params)
+
+
+class TorrentSyncEngine:
+    """
+    Incremental mirror of qBittorrent's torrent list.
+    Uses the /api/v2/sync/maindata rid protocol so that after the first
+    request only changed fields, new torrents and removals are transferred.
+    """
+
+    def __init__(self, client: QBittorrentClient):
+        self.client = client
+        self.rid = 0
+        self.torrents: Dict[str, Dict] = {}
+        self.completed: Set[str] = set()
+        # Serializes polls: a poll abandoned by a timeout may still be running
+        self.poll_lock = threading.Lock()
+        # Guards the tables; only held while applying a response, never
+        # across a request, so readers on the event loop do not block
+        self.lock = threading.Lock()
+
+    def reset(self):
+        """Drop the local table and request a full update on the next poll"""
+        with self.poll_lock, self.lock:
+            self.rid = 0
+            self.torrents.clear()
+            self.completed.clear()
+
+    def poll(self) -> list:
+        """Fetch the next delta and return torrents that became complete"""
+        with self.poll_lock:
+            data = self.client.maindata(self.rid)
+            with self.lock:
+                return self.apply(data)
+
+    def apply(self, data: Dict) -> list:
+        """
+        Merge a maindata response into the torrent table.
+        Returns torrents whose progress reached 1.0 with this update.
+        """
+        if data.get('full_update'):
+            self.torrents.clear()
+            self.completed.clear()
+
+        for hash_id in data.get('torrents_removed') or []:
+            self.torrents.pop(hash_id, None)
+            self.completed.discard(hash_id)
+
+        newly_completed = []
+        for hash_id, delta in (data.get('torrents') or {}).items():
+            torrent = self.torrents.setdefault(hash_id, {'hash': hash_id})
+            torrent.update(delta)
+
+            if torrent.get('progress', 0) == 1.0:
+                if hash_id not in self.completed:
+                    self.completed.add(hash_id)
+                    newly_completed.append(torrent)
+            else:
+                # Rechecked or re-downloading torrents can complete again
+                self.completed.discard(hash_id)
+
+        self.rid = data.get('rid', self.rid)
+        return newly_completed
+
+
+class CompletionIntake:
+    """
+    Spool directory fed by completion-handler.sh.
+    The hook drops one file per finished torrent, named after its info hash.
+    inotify_fd becomes readable when entries arrive; without inotify the
+    directory has to be drained periodically.
+    """
+
+    IN_CLOSE_WRITE = 0x00000008
+    IN_MOVED_TO = 0x00000080
+    HASH_PATTERN = re.compile(r'^[0-9a-fA-F]{40}([0-9a-fA-F]{24})?$')
+
+    def __init__(self, directory: Path):
+        self.directory = directory
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.inotify_fd: Optional[int] = self._open_inotify()
+
+    def _open_inotify(self) -> Optional[int]:
+        """Set up an inotify watch on the spool directory (Linux only)"""
+        try:
+            libc = ctypes.CDLL(None, use_errno=True)
+            fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+            if fd < 0:
+                raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+            wd = libc.inotify_add_watch(
+                fd, os.fsencode(str(self.directory)),
+                self.IN_CLOSE_WRITE | self.IN_MOVED_TO
+            )
+            if wd < 0:
+                os.close(fd)
+                raise OSError(ctypes.get_errno(), "inotify_add_watch failed")
+            return fd
+        except Exception as e:
+            logger.warning(f"inotify unavailable, checking intake every second: {e}")
+            return None
+
+    def drain(self) -> list:
+        """Consume all queued hashes from the spool directory"""
+        hashes = []
+        try:
+            with os.scandir(self.directory) as entries:
+                for entry in entries:
+                    # Hidden files are in-progress writes from the hook
+                    if entry.name.startswith('.'):
+                        continue
+                    try:
+                        os.unlink(entry.path)
+                    except FileNotFoundError:
+                        continue
+                    if self.HASH_PATTERN.match(entry.name):
+                        hashes.append(entry.name.lower())
+                    else:
+                        logger.warning(f"Ignoring unexpected intake entry: {entry.name}")
+        except Exception as e:
+            logger.error(f"Failed to read intake directory: {e}")
+        return hashes
+
+
+class ContentSnapshot:
+    """
+    Single scan of a torrent's content path.
+    Built once per torrent with os.scandir and shared by classification and
+    linking so that large season packs are only walked one time.
+    """
+
+    # Video file extensions (including Bluray formats)
+    VIDEO_EXTENSIONS = ('.mkv', '.mp4', '.avi', '.mov', '.wmv', '.m4v', '.mpg', '.mpeg', '.iso', '.m2ts', '.ts')
+    # Files linked into TV season folders (disc images and streams are skipped)
+    EPISODE_EXTENSIONS = ('.mkv', '.mp4', '.avi', '.mov', '.wmv', '.m4v', '.mpg', '.mpeg')
+    DISC_MARKERS = frozenset({'BDMV', 'VIDEO_TS', 'STREAM'})
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.exists = False
+        self.is_dir = False
+        self.from_metadata = False
+        self.dirs: list = []             # Relative subdirectory paths, top-down
+        self.files: list = []            # Relative file paths, top-down
+        self.top_level_files: list = []  # File names directly under path
+        self.video_files: list = []      # Relative paths of video files
+        self.has_disc_structure = False
+
+    @classmethod
+    def scan(cls, content_path: str) -> 'ContentSnapshot':
+        """Walk content_path once and record everything later steps need"""
+        snapshot = cls(Path(content_path))
+        try:
+            st = os.stat(content_path)
+        except OSError:
+            return snapshot
+        snapshot.exists = True
+
+        if not stat.S_ISDIR(st.st_mode):
+            snapshot._add_file(snapshot.path.name, top_level=True)
+            return snapshot
+
+        snapshot.is_dir = True
+        pending = ['']
+        while pending:
+            rel_dir = pending.pop()
             try:
-                with open(STATE_FILE, 'r') as f:
+                with os.scandir(os.path.join(content_path, rel_dir)) as entries:
+                    subdirs = []
+                    for entry in entries:
+                        rel_path = os.path.join(rel_dir, entry.name) if rel_dir else entry.name
+                        if entry.is_dir(follow_symlinks=False):
+                            subdirs.append(rel_path)
+                            if entry.name in cls.DISC_MARKERS:
+                                snapshot.has_disc_structure = True
+                        else:
+                            snapshot._add_file(rel_path, top_level=not rel_dir)
+                    snapshot.dirs.extend(subdirs)
+                    pending.extend(reversed(subdirs))
+            except OSError as e:
+                logger.debug(f"Error scanning {rel_dir or content_path}: {e}")
+        return snapshot
+
+    @classmethod
+    def from_files(cls, content_path: str, save_path: str, files: list) -> 'ContentSnapshot':
+        """
+        Build a snapshot from qBittorrent's file list without touching the disk.
+        File names are relative to save_path and use "/" separators.
+        """
+        snapshot = cls(Path(content_path))
+        snapshot.from_metadata = True
+        snapshot.exists = True
+        seen_dirs = set()
+
+        for entry in files:
+            # Files that are not downloaded never reach the disk
+            if entry.get('priority', 1) == 0:
+                continue
+            full_path = os.path.join(save_path, *entry.get('name', '').split('/'))
+            rel_path = os.path.relpath(full_path, content_path)
+            if rel_path == '.':
+                snapshot._add_file(snapshot.path.name, top_level=True)
+                continue
+
+            snapshot.is_dir = True
+            parent = os.path.dirname(rel_path)
+            missing = []
+            while parent and parent not in seen_dirs:
+                missing.append(parent)
+                parent = os.path.dirname(parent)
+            for rel_dir in reversed(missing):
+                seen_dirs.add(rel_dir)
+                snapshot.dirs.append(rel_dir)
+                if os.path.basename(rel_dir) in cls.DISC_MARKERS:
+                    snapshot.has_disc_structure = True
+            snapshot._add_file(rel_path, top_level=os.sep not in rel_path)
+
+        return snapshot
+
+    def _add_file(self, rel_path: str, top_level: bool):
+        self.files.append(rel_path)
+        if top_level:
+            self.top_level_files.append(os.path.basename(rel_path))
+        if rel_path.lower().endswith(self.VIDEO_EXTENSIONS):
+            self.video_files.append(rel_path)
+
+    @property
+    def has_video_content(self) -> bool:
+        """True for a video file or a directory with video files or disc structures"""
+        return bool(self.video_files) or self.has_disc_structure
+
+
+class Classification(NamedTuple):
+    """Result of classifying a torrent or file name"""
+    media_type: Optional[str]  # "tv", "movie" or None
+    show_name: Optional[str]
+    season: Optional[str]
+    has_episode: bool = False  # Name contains an S##E## marker
+
+
+class MediaClassifier:
+    """
+    Compiled, memoized media name classifier.
+    All season/episode patterns are combined into one regex so a name is
+    classified in a single scan. Results are cached per name in a bounded LRU.
+    """
+
+    # Alternatives are listed so the longer form wins at the same position
+    SEASON_PATTERN = re.compile(
+        r'(?P<episode>[Ss](?P<episode_num>\d{2})[Ee]\d{2})'   # S01E01
+        r'|(?P<cross>(?P<cross_num>\d{1,2})x\d{2})'           # 1x01
+        r'|(?P<named>[Ss]eason\s*(?P<named_num>\d{1,2}))'     # Season 01, season 1
+        r'|(?P<pack>[Ss](?P<pack_num>\d{2}))'                 # S01 (season pack)
+    )
+    YEAR_PATTERN = re.compile(r'\((?:19|20)\d{2}\)|[.\-\s](?:19|20)\d{2}(?:[.\-\s]|$)')
+    TRAILING_SEPARATORS = re.compile(r'[._-]+$')
+
+    # Order in which season markers are trusted for show info extraction
+    PRIORITY = {'episode': 0, 'pack': 1, 'cross': 2, 'named': 3}
+
+    def __init__(self, cache_size: int = CLASSIFIER_CACHE_SIZE):
+        self.classify = functools.lru_cache(maxsize=cache_size)(self._classify)
+
+    def _classify(self, name: str) -> Classification:
+        best = None
+        is_tv = False
+        has_episode = False
+
+        for match in self.SEASON_PATTERN.finditer(name):
+            kind = match.lastgroup
+            if kind == 'pack':
+                # "S01" only marks a season pack when followed by something
+                # other than an episode marker
+                following = name[match.end():match.end() + 1]
+                is_tv = is_tv or (following != '' and following not in 'Ee')
+            else:
+                is_tv = True
+                has_episode = has_episode or kind == 'episode'
+            if best is None or self.PRIORITY[kind] < self.PRIORITY[best.lastgroup]:
+                best = match
+
+        show_name = season = None
+        if best is not None:
+            season = best.group(f"{best.lastgroup}_num").zfill(2)
+            show_name = self.TRAILING_SEPARATORS.sub('', name[:best.start()])
+            show_name = show_name.replace('.', ' ').replace('_', ' ').strip()
+
+        if is_tv:
+            media_type = 'tv'
+        elif self.YEAR_PATTERN.search(name):
+            media_type = 'movie'
+        else:
+            media_type = None
+        return Classification(media_type, show_name, season, has_episode)
+
+    def classify_many(self, names: Iterable[str]) -> list:
+        """Classify a batch of names, reusing results for repeated names"""
+        results: Dict[str, Classification] = {}
+        classify = self.classify
+        return [results[n] if n in results else results.setdefault(n, classify(n)) for n in names]
+
+    def cache_info(self):
+        return self.classify.cache_info()
+
+
+class LinkJob(NamedTuple):
+    """A classified torrent waiting to be linked into the library"""
+    hash_id: str
+    name: str
+    source: Path
+    library_dir: Path            # MOVIES_DIR or TV_DIR
+    destination: Path            # Folder the job writes into
+    show_name: Optional[str]
+    season: Optional[str]
+    snapshot: ContentSnapshot
+    section_id: str
+    library: str
+    completed_on: int = 0        # qBittorrent completion timestamp
+    size: int = 0                # Bytes selected for download
+    category: str = ""           # qBittorrent category
+
+
+class BacklogQueue:
+    """
+    Priority queue of link jobs.
+    Jobs are ordered by QUEUE_ORDER, but the oldest job is taken first once
+    it has waited max_wait seconds, so large or low-priority torrents are
+    delayed rather than starved.
+    """
+
+    def __init__(self, order: str = QUEUE_ORDER, categories: Optional[list] = None,
+                 max_wait: float = QUEUE_MAX_WAIT):
+        if order not in ("completion", "size", "category"):
+            logger.warning(f"Unknown QUEUE_ORDER {order!r}, using completion")
+            order = "completion"
+        self.order = order
+        self.categories = {c: i for i, c in enumerate(QUEUE_CATEGORIES if categories is None else categories)}
+        self.max_wait = max_wait
+        self.heap: list = []           # (priority, seq, entry)
+        self.arrivals: deque = deque()  # Entries in enqueue order
+        self.seq = 0
+        self.size = 0
+
+    def priority(self, job: LinkJob) -> tuple:
+        if self.order == "size":
+            return (job.size, job.completed_on)
+        if self.order == "category":
+            return (self.categories.get(job.category, len(self.categories)), job.completed_on)
+        return (job.completed_on,)
+
+    def push(self, job: LinkJob):
+        entry = [job, time.monotonic(), False]  # job, enqueued_at, taken
+        self.seq += 1
+        heapq.heappush(self.heap, (self.priority(job), self.seq, entry))
+        self.arrivals.append(entry)
+        self.size += 1
+
+    def pop(self) -> tuple:
+        """Next (job, seconds waited); raises IndexError when empty"""
+        while self.arrivals and self.arrivals[0][2]:
+            self.arrivals.popleft()
+        if not self.arrivals:
+            raise IndexError("pop from empty backlog")
+        now = time.monotonic()
+        entry = self.arrivals[0]
+        if now - entry[1] < self.max_wait:
+            while True:
+                entry = heapq.heappop(self.heap)[2]
+                if not entry[2]:
+                    break
+        entry[2] = True
+        self.size -= 1
+        return entry[0], now - entry[1]
+
+    def __len__(self) -> int:
+        return self.size
+
+
+class DirectoryLocks:
+    """
+    Per-destination locks so two torrents never link into the same
+    Show/Season XX folder at the same time. Entries are dropped once no
+    job holds or waits for them.
+    """
+
+    def __init__(self):
+        self._guard = threading.Lock()
+        self._locks: Dict[Path, list] = {}  # {path: [lock, users]}
+
+    @contextlib.contextmanager
+    def hold(self, path: Path):
+        with self._guard:
+            entry = self._locks.setdefault(path, [threading.Lock(), 0])
+            entry[1] += 1
+        try:
+            with entry[0]:
+                yield
+        finally:
+            with self._guard:
+                entry[1] -= 1
+                if entry[1] == 0:
+                    del self._locks[path]
+
+
+class RefreshScheduler:
+    """
+    Debounced, path-scoped Plex library refreshes.
+    Changed folders are collected per section and flushed as partial
+    refreshes once the section has been quiet for the debounce window.
+    """
+
+    def __init__(self, refresh, delay: float = PLEX_REFRESH_DELAY,
+                 max_paths: int = PLEX_REFRESH_MAX_PATHS):
+        self.refresh = refresh  # refresh(section_id, library, path or None)
+        self.delay = delay
+        self.max_paths = max_paths
+        self.pending: Dict[str, Dict] = {}  # {section_id: {library, paths, first, last}}
+        self.lock = threading.Lock()
+        self.on_request = None  # Called after each request, e.g. to wake a waiter
+
+    def request(self, section_id: str, library: str, path: Optional[Path] = None):
+        """Queue a refresh of path (or the whole section when None)"""
+        now = time.monotonic()
+        with self.lock:
+            entry = self.pending.setdefault(
+                section_id, {'library': library, 'paths': set(), 'full': False, 'first': now}
+            )
+            entry['last'] = now
+            if path is None:
+                entry['full'] = True
+            else:
+                entry['paths'].add(path)
+        if self.on_request is not None:
+            self.on_request()
+
+    def next_deadline(self) -> Optional[float]:
+        """Monotonic time at which the next section becomes due"""
+        with self.lock:
+            return min((self._deadline(e) for e in self.pending.values()), default=None)
+
+    def _deadline(self, entry: Dict) -> float:
+        return min(entry['last'] + self.delay, entry['first'] + 5 * self.delay)
+
+    def pop_due(self, force: bool = False) -> list:
+        """Remove due sections and return the (section_id, library, path) refreshes to send"""
+        now = time.monotonic()
+        calls = []
+        with self.lock:
+            for section_id, entry in list(self.pending.items()):
+                if force or now >= self._deadline(entry):
+                    del self.pending[section_id]
+                    calls.extend(self._section_calls(section_id, entry))
+        return calls
+
+    def flush_due(self, force: bool = False):
+        """Issue refreshes for every section whose window has expired"""
+        for call in self.pop_due(force):
+            self.refresh(*call)
+
+    def _section_calls(self, section_id: str, entry: Dict) -> list:
+        paths = self._collapse(entry['paths'])
+        if entry['full'] or len(paths) > self.max_paths:
+            return [(section_id, entry['library'], None)]
+        return [(section_id, entry['library'], path) for path in paths]
+
+    @staticmethod
+    def _collapse(paths: Set[Path]) -> list:
+        """Drop folders already covered by a pending parent folder"""
+        result = []
+        kept = set()
+        # Parents sort first, so each path only checks its own ancestors
+        for path in sorted(paths, key=lambda p: len(p.parts)):
+            if not any(parent in kept for parent in path.parents):
+                result.append(path)
+                kept.add(path)
+        return result
+
+
+class StateStore:
+    """
+    Backend for processed torrent state.
+    Every processed hash is recorded with its classification, destination,
+    link count and timestamps.
+    """
+
+    def load(self) -> Set[str]:
+        """Return all processed hashes"""
+        raise NotImplementedError
+
+    def add(self, hash_id: str, record: Dict):
+        """Durably record a processed torrent"""
+        raise NotImplementedError
+
+    def add_many(self, records: Dict[str, Dict]):
+        """Durably record a batch of processed torrents at once"""
+        for hash_id, record in records.items():
+            self.add(hash_id, record)
+
+    def reconcile(self, present: Set[str], expire_before: float) -> list:
+        """
+        Compare stored hashes with the torrents qBittorrent still has.
+        Missing hashes are stamped with removed_at, hashes that came back are
+        unstamped, and hashes removed before expire_before are deleted.
+        Returns the deleted hashes.
+        """
+        raise NotImplementedError
+
+    def disk_usage(self) -> int:
+        """Bytes used on disk by the backend"""
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class JsonStateStore(StateStore):
+    """
+    Legacy single-file JSON state.
+    The whole file is rewritten on every insert, atomically via rename.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.records: Dict[str, Dict] = {}
+        self.lock = threading.Lock()
+
+    def load(self) -> Set[str]:
+        if self.path.exists():
+            try:
+                with open(self.path, 'r') as f:
                     data = json.load(f)
-                    return set(data.get('processed', []))
+                self.records = data.get('records', {})
+                for hash_id in data.get('processed', []):
+                    self.records.setdefault(hash_id, {})
+                return set(self.records)
             except Exception as e:
                 logger.warning(f"Failed to load state: {e}")
         return set()
 
-    def save_state(self):
-        """Save processed torrent hashes"""
+    def add(self, hash_id: str, record: Dict):
+        with self.lock:
+            self.records[hash_id] = record
+            self._write()
+
+    def add_many(self, records: Dict[str, Dict]):
+        with self.lock:
+            self.records.update(records)
+            self._write()
+
+    def reconcile(self, present: Set[str], expire_before: float) -> list:
+        now = time.time()
+        expired = []
+        with self.lock:
+            for hash_id, record in list(self.records.items()):
+                if hash_id in present:
+                    record.pop('removed_at', None)
+                elif 'removed_at' not in record:
+                    record['removed_at'] = now
+                elif record['removed_at'] < expire_before:
+                    expired.append(hash_id)
+                    del self.records[hash_id]
+            self._write()
+        return expired
+
+    def disk_usage(self) -> int:
+        try:
+            return self.path.stat().st_size
+        except OSError:
+            return 0
+
+    def _write(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_name(f".{self.path.name}.tmp")
+        with open(tmp_path, 'w') as f:
+            json.dump({'processed': list(self.records), 'records': self.records}, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+
+
+class SQLiteStateStore(StateStore):
+    """
+    SQLite state in WAL mode.
+    Each insert is a single-row transaction, so cost does not grow with the
+    number of processed torrents and a crash never leaves a torn file.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS processed (
+            hash TEXT PRIMARY KEY,
+            name TEXT,
+            media_type TEXT,
+            destination TEXT,
+            link_count INTEGER NOT NULL DEFAULT 0,
+            linked INTEGER NOT NULL DEFAULT 0,
+            completed_on INTEGER,
+            processed_at REAL NOT NULL,
+            removed_at REAL
+        )
+    """
+
+    def __init__(self, path: Path, legacy_file: Optional[Path] = None, read_only: bool = False):
+        self.path = path
+        self.lock = threading.Lock()
+        self.legacy_file = legacy_file
+        self.read_only = read_only
+        if read_only:
+            # Reads the existing database, if any, without creating or migrating
+            # anything. mode=rw never creates the file, and unlike mode=ro it
+            # lets SQLite remove the -wal/-shm files again on close
+            self.db = None
+            if path.exists():
+                self.db = sqlite3.connect(f"{path.resolve().as_uri()}?mode=rw", uri=True,
+                                          check_same_thread=False, isolation_level=None)
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.db = sqlite3.connect(str(path), check_same_thread=False, isolation_level=None)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=FULL")
+        self.db.execute(self.SCHEMA)
+        columns = {row[1] for row in self.db.execute("PRAGMA table_info(processed)")}
+        if 'removed_at' not in columns:
+            self.db.execute("ALTER TABLE processed ADD COLUMN removed_at REAL")
+        if legacy_file is not None:
+            self._import_legacy(legacy_file)
+
+    def _import_legacy(self, legacy_file: Path):
+        """One-time import of processed_torrents.json"""
+        if not legacy_file.exists():
+            return
+        hashes = JsonStateStore(legacy_file).load()
+        now = time.time()
+        with self.lock:
+            self.db.execute("BEGIN")
+            self.db.executemany(
+                "INSERT OR IGNORE INTO processed (hash, processed_at) VALUES (?, ?)",
+                ((h, now) for h in hashes)
+            )
+            self.db.execute("COMMIT")
+        legacy_file.rename(legacy_file.with_name(f"{legacy_file.name}.migrated"))
+        logger.info(f"Imported {len(hashes)} processed torrents from {legacy_file}")
+
+    def load(self) -> Set[str]:
+        if self.read_only:
+            return self._load_read_only()
+        with self.lock:
+            return {row[0] for row in self.db.execute("SELECT hash FROM processed")}
+
+    def _load_read_only(self) -> Set[str]:
+        """Database hashes plus a legacy file that has not been imported yet"""
+        hashes = set()
+        if self.db is not None:
+            with self.lock:
+                hashes = {row[0] for row in self.db.execute("SELECT hash FROM processed")}
+        if self.legacy_file is not None:
+            hashes |= JsonStateStore(self.legacy_file).load()
+        return hashes
+
+    INSERT = (
+        "INSERT OR REPLACE INTO processed "
+        "(hash, name, media_type, destination, link_count, linked, completed_on, processed_at) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?, ?)"
+    )
+
+    @staticmethod
+    def _row(hash_id: str, record: Dict) -> tuple:
+        return (hash_id, record.get('name'), record.get('media_type'), record.get('destination'),
+                record.get('link_count', 0), int(record.get('linked', False)),
+                record.get('completed_on'), record.get('processed_at', time.time()))
+
+    def add(self, hash_id: str, record: Dict):
+        with self.lock:
+            self.db.execute(self.INSERT, self._row(hash_id, record))
+
+    def add_many(self, records: Dict[str, Dict]):
+        with self.lock:
+            self.db.execute("BEGIN")
+            try:
+                self.db.executemany(self.INSERT, (self._row(h, r) for h, r in records.items()))
+                self.db.execute("COMMIT")
+            except Exception:
+                self.db.execute("ROLLBACK")
+                raise
+
+    def reconcile(self, present: Set[str], expire_before: float) -> list:
+        now = time.time()
+        with self.lock:
+            self.db.execute("BEGIN")
+            try:
+                self.db.execute("CREATE TEMP TABLE present (hash TEXT PRIMARY KEY)")
+                self.db.executemany("INSERT OR IGNORE INTO present VALUES (?)", ((h,) for h in present))
+                self.db.execute(
+                    "UPDATE processed SET removed_at = NULL "
+                    "WHERE removed_at IS NOT NULL AND hash IN (SELECT hash FROM present)"
+                )
+                self.db.execute(
+                    "UPDATE processed SET removed_at = ? "
+                    "WHERE removed_at IS NULL AND hash NOT IN (SELECT hash FROM present)",
+                    (now,)
+                )
+                expired = [row[0] for row in self.db.execute(
+                    "SELECT hash FROM processed WHERE removed_at < ?", (expire_before,)
+                )]
+                self.db.execute("DELETE FROM processed WHERE removed_at < ?", (expire_before,))
+                self.db.execute("DROP TABLE present")
+                self.db.execute("COMMIT")
+            except Exception:
+                self.db.execute("ROLLBACK")
+                raise
+            # Fold the WAL back into the main file so disk usage shrinks too
+            self.db.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        return expired
+
+    def disk_usage(self) -> int:
+        total = 0
+        for suffix in ('', '-wal', '-shm'):
+            try:
+                total += os.stat(f"{self.path}{suffix}").st_size
+            except OSError:
+                pass
+        return total
+
+    def close(self):
+        with self.lock:
+            if self.db is not None:
+                self.db.close()
+
+
+def open_state_store(read_only: bool = False) -> StateStore:
+    """Open the configured state backend"""
+    if STATE_BACKEND == "json":
+        return JsonStateStore(STATE_FILE)
+    return SQLiteStateStore(STATE_DB, legacy_file=STATE_FILE, read_only=read_only)
+
+
+class LinkSummary:
+    """Per-torrent outcome of placing files in the library"""
+
+    def __init__(self, error: Optional[str] = None):
+        self.linked = 0
+        self.reflinked = 0  # Cross-device, cloned extents
+        self.copied = 0     # Cross-device, copied in the kernel
+        self.skipped = 0    # Target already existed
+        self.duplicates = 0 # Content already in the library under another name
+        self.failed = 0
+        self.failures: list = []  # First FAILURE_SAMPLE (path, error) pairs
+        self.error = error
+
+    FAILURE_SAMPLE = 5
+
+    def add_failure(self, path: str, error: Exception):
+        self.failed += 1
+        if len(self.failures) < self.FAILURE_SAMPLE:
+            self.failures.append((path, str(error)))
+
+    def failure_report(self) -> str:
+        """Sampled per-file failures for the torrent's summary line"""
+        text = '; '.join(f"{path}: {error}" for path, error in self.failures)
+        if self.failed > len(self.failures):
+            text += f"; and {self.failed - len(self.failures)} more"
+        return text
+
+    @property
+    def placed(self) -> int:
+        """Files newly placed in the library by any method"""
+        return self.linked + self.reflinked + self.copied
+
+    @property
+    def ok(self) -> bool:
+        """No fatal error and at least one file is in place (or nothing to do)"""
+        if self.error is not None:
+            return False
+        return self.placed + self.skipped > 0 or self.failed == 0
+
+    def __bool__(self) -> bool:
+        return self.ok
+
+    def __str__(self) -> str:
+        if self.error is not None:
+            return self.error
+        text = f"{self.linked} linked"
+        if self.reflinked:
+            text += f", {self.reflinked} reflinked"
+        if self.copied:
+            text += f", {self.copied} copied"
+        text += f", {self.skipped} already present"
+        if self.duplicates:
+            text += f" ({self.duplicates} under another name)"
+        return text + f", {self.failed} failed"
+
+
+class LibraryIndex:
+    """
+    Persistent (st_dev, st_ino) -> path index of the Plex library.
+    Gives O(1) "already in library" checks for source files regardless of
+    the name they were linked under. Copies placed across filesystems are
+    recorded under their source inode as well. Built by one walk of the
+    library roots and then updated incrementally by HardlinkEngine. The walk
+    only adds entries, so links recorded while it runs are kept; stale ones
+    are dropped by lookup. Until a walk completes the index is rebuilt on
+    every start.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS inodes (
+            dev INTEGER NOT NULL,
+            ino INTEGER NOT NULL,
+            path TEXT NOT NULL,
+            PRIMARY KEY (dev, ino, path)
+        ) WITHOUT ROWID;
+        CREATE TABLE IF NOT EXISTS meta (
+            key TEXT PRIMARY KEY,
+            value TEXT NOT NULL
+        )
+    """
+
+    def __init__(self, path: Path):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(str(path), check_same_thread=False, isolation_level=None)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.executescript(self.SCHEMA)
+
+    def is_built(self) -> bool:
+        """Whether a walk of the library roots has completed"""
+        with self.lock:
+            return self.db.execute("SELECT 1 FROM meta WHERE key = 'built'").fetchone() is not None
+
+    def lookup(self, key: tuple, exclude: Optional[str] = None) -> Optional[str]:
+        """
+        Library path other than exclude still holding this inode. Entries
+        whose path went away or was replaced by another file are dropped.
+        """
+        with self.lock:
+            rows = self.db.execute(
+                "SELECT path FROM inodes WHERE dev = ? AND ino = ?", key
+            ).fetchall()
+        for (path,) in rows:
+            if path == exclude:
+                continue
+            try:
+                st = os.lstat(path)
+            except FileNotFoundError:
+                st = None
+            except OSError:
+                continue  # Unreadable right now, keep the entry
+            if st is not None and (st.st_dev, st.st_ino) == key:
+                return path
+            self.remove(key, path)
+        return None
+
+    def add_many(self, entries: list):
+        """Record (dev, ino, path) entries in one transaction"""
+        if not entries:
+            return
+        with self.lock:
+            self.db.execute("BEGIN")
+            self.db.executemany("INSERT OR IGNORE INTO inodes VALUES (?, ?, ?)", entries)
+            self.db.execute("COMMIT")
+
+    def remove(self, key: tuple, path: str):
+        with self.lock:
+            self.db.execute("DELETE FROM inodes WHERE dev = ? AND ino = ? AND path = ?", (*key, path))
+
+    def build(self, roots: Iterable[Path], stop: Optional[threading.Event] = None) -> Optional[int]:
+        """
+        Merge a walk of the library roots into the index and mark it built.
+        Returns the number of files seen, or None if stop was set first.
+        """
+        entries = []
+        pending = [str(root) for root in roots]
+        while pending:
+            if stop is not None and stop.is_set():
+                return None
+            directory = pending.pop()
+            try:
+                with os.scandir(directory) as it:
+                    for entry in it:
+                        if entry.is_dir(follow_symlinks=False):
+                            pending.append(entry.path)
+                        elif entry.is_file(follow_symlinks=False):
+                            st = entry.stat(follow_symlinks=False)
+                            entries.append((st.st_dev, st.st_ino, entry.path))
+            except OSError as e:
+                logger.debug(f"Error indexing {directory}: {e}")
+        with self.lock:
+            self.db.execute("BEGIN")
+            self.db.executemany("INSERT OR IGNORE INTO inodes VALUES (?, ?, ?)", entries)
+            self.db.execute("INSERT OR REPLACE INTO meta VALUES ('built', ?)", (str(int(time.time())),))
+            self.db.execute("COMMIT")
+        return len(entries)
+
+    def duplicates(self) -> list:
+        """Inodes present under more than one library path"""
+        with self.lock:
+            rows = self.db.execute(
+                "SELECT group_concat(path, char(10)) FROM inodes "
+                "GROUP BY dev, ino HAVING count(*) > 1"
+            ).fetchall()
+        return [row[0].split('\n') for row in rows]
+
+    def report_duplicates(self):
+        """Log content that is linked more than once, e.g. in both Movies and TV"""
+        groups = self.duplicates()
+        if not groups:
+            return
+        cross_tree = [g for g in groups if len({MOVIES_DIR in Path(p).parents for p in g}) > 1]
+        logger.info(f"Library has {len(groups)} files linked under several names "
+                    f"({len(cross_tree)} across Movies and TV)")
+        for group in groups[:20]:
+            logger.info(f"   Duplicate: {' | '.join(group)}")
+
+    def close(self):
+        with self.lock:
+            self.db.close()
+
+
+class HardlinkEngine:
+    """
+    Creates hardlinks with linkat(2) relative to directory descriptors.
+    Each source and destination directory is opened once per run, existing
+    targets are detected from EEXIST instead of a stat per file, and
+    destination directories already created are cached across runs.
+
+    When source and library live on different filesystems (EXDEV) files are
+    reflinked (FICLONE) where supported, otherwise copied in the kernel with
+    copy_file_range/sendfile. Copies go to a hidden .partial file first and
+    resume from its size after an interruption.
+    """
+
+    DIR_CACHE_SIZE = 4096
+    DIR_FLAGS = os.O_RDONLY | os.O_DIRECTORY | os.O_CLOEXEC
+    FICLONE = 0x40049409  # _IOW(0x94, 9, int)
+    # Errors meaning "this filesystem cannot do that", not a real failure
+    UNSUPPORTED = (errno.EOPNOTSUPP, errno.ENOTTY, errno.EXDEV, errno.EINVAL, errno.ENOSYS)
+
+    def __init__(self, fallback: str = CROSS_DEVICE_FALLBACK, chunk_size: int = COPY_CHUNK_SIZE,
+                 index: Optional[LibraryIndex] = None):
+        self.lock = threading.Lock()
+        self.index = index
+        self.known_dirs: OrderedDict = OrderedDict()
+        self.fallback = fallback
+        self.chunk_size = chunk_size
+
+    def ensure_dir(self, path: str):
+        """mkdir -p, skipped for directories this engine already created"""
+        with self.lock:
+            if path in self.known_dirs:
+                self.known_dirs.move_to_end(path)
+                return
+        os.makedirs(path, exist_ok=True)
+        with self.lock:
+            self.known_dirs[path] = None
+            if len(self.known_dirs) > self.DIR_CACHE_SIZE:
+                self.known_dirs.popitem(last=False)
+
+    def forget_dir(self, path: str):
+        with self.lock:
+            self.known_dirs.pop(path, None)
+
+    def _dir_fd(self, fds: Dict[str, int], path: str, create: bool = False) -> int:
+        fd = fds.get(path)
+        if fd is not None:
+            return fd
+        if create:
+            self.ensure_dir(path)
+        try:
+            fd = os.open(path, self.DIR_FLAGS)
+        except FileNotFoundError:
+            if not create:
+                raise
+            # Removed behind our back since it was cached
+            self.forget_dir(path)
+            self.ensure_dir(path)
+            fd = os.open(path, self.DIR_FLAGS)
+        fds[path] = fd
+        return fd
+
+    def link(self, src_root: str, dst_root: str, pairs: Iterable[tuple]) -> LinkSummary:
+        """
+        Link (source relative path, target relative path) pairs from
+        src_root into dst_root.
+        """
+        summary = LinkSummary()
+        fds: Dict[str, int] = {}
+        indexed = []  # (dev, ino, path) entries to add to the library index
+        try:
+            for src_rel, dst_rel in pairs:
+                src_dir, src_name = os.path.split(os.path.join(src_root, src_rel))
+                dst_dir, dst_name = os.path.split(os.path.join(dst_root, dst_rel))
+                dst_path = os.path.join(dst_dir, dst_name)
+                try:
+                    src_fd = self._dir_fd(fds, src_dir)
+                    dst_fd = self._dir_fd(fds, dst_dir, create=True)
+                    try:
+                        os.link(src_name, dst_name, src_dir_fd=src_fd, dst_dir_fd=dst_fd)
+                    except OSError as e:
+                        if e.errno != errno.EXDEV or self.fallback == "none":
+                            raise
+                        # Only consult the index when a new name would be created
+                        key = None
+                        if self.index is not None:
+                            src_stat = os.stat(src_name, dir_fd=src_fd)
+                            key = (src_stat.st_dev, src_stat.st_ino)
+                            if self._indexed_elsewhere(key, dst_path, summary):
+                                continue
+                        if self._place_cross_device(src_fd, src_name, dst_fd, dst_name):
+                            summary.reflinked += 1
+                        else:
+                            summary.copied += 1
+                        if key is not None:
+                            dst_stat = os.stat(dst_name, dir_fd=dst_fd)
+                            indexed.append((dst_stat.st_dev, dst_stat.st_ino, dst_path))
+                            indexed.append((*key, dst_path))
+                        continue
+
+                    if self.index is not None:
+                        # The new name shares the source inode
+                        dst_stat = os.stat(dst_name, dir_fd=dst_fd, follow_symlinks=False)
+                        key = (dst_stat.st_dev, dst_stat.st_ino)
+                        if self._indexed_elsewhere(key, dst_path, summary):
+                            os.unlink(dst_name, dir_fd=dst_fd)
+                            continue
+                        indexed.append((*key, dst_path))
+                    summary.linked += 1
+                except FileExistsError:
+                    # Reprocessing costs one linkat per file and no lookups
+                    summary.skipped += 1
+                except OSError as e:
+                    # Reported once per torrent by create_hardlink
+                    summary.add_failure(src_rel, e)
+        finally:
+            for fd in fds.values():
+                os.close(fd)
+            if self.index is not None:
+                try:
+                    self.index.add_many(indexed)
+                except Exception as e:
+                    logger.warning(f"Failed to update library index: {e}")
+        return summary
+
+    def _indexed_elsewhere(self, key: tuple, dst_path: str, summary: LinkSummary) -> bool:
+        """Count the file as present when the library holds its inode under another name"""
+        existing = self.index.lookup(key, exclude=dst_path)
+        if existing is None:
+            return False
+        summary.skipped += 1
+        summary.duplicates += 1
+        return True
+
+    def _place_cross_device(self, src_fd: int, src_name: str, dst_fd: int, dst_name: str) -> bool:
+        """
+        Place a file across filesystems. Returns True for a reflink and
+        False for a copy; raises when neither is possible.
+        """
+        partial_name = f".{dst_name}.partial"
+        src = os.open(src_name, os.O_RDONLY | os.O_CLOEXEC, dir_fd=src_fd)
+        try:
+            src_stat = os.fstat(src)
+            dst = os.open(partial_name, os.O_WRONLY | os.O_CREAT | os.O_CLOEXEC, 0o600, dir_fd=dst_fd)
+            try:
+                reflinked = self._reflink(src, dst)
+                if not reflinked:
+                    if self.fallback != "copy":
+                        raise OSError(errno.EXDEV, "reflink not supported and copy fallback disabled")
+                    self._copy(src, dst, src_stat.st_size)
+                os.fchmod(dst, stat.S_IMODE(src_stat.st_mode))
+                os.utime(dst, ns=(src_stat.st_atime_ns, src_stat.st_mtime_ns))
+                os.fsync(dst)
+            finally:
+                os.close(dst)
+        finally:
+            os.close(src)
+
+        # Refuse to clobber a file that appeared while copying
+        try:
+            os.stat(dst_name, dir_fd=dst_fd, follow_symlinks=False)
+            os.unlink(partial_name, dir_fd=dst_fd)
+            raise FileExistsError(errno.EEXIST, "target appeared during copy", dst_name)
+        except FileNotFoundError:
+            pass
+        os.rename(partial_name, dst_name, src_dir_fd=dst_fd, dst_dir_fd=dst_fd)
+        return reflinked
+
+    def _reflink(self, src: int, dst: int) -> bool:
+        """Share the source extents with dst (Btrfs, XFS)"""
         try:
-            STATE_FILE.parent.mkdir(parents=True, exist_ok=True)
-            with open(STATE_FILE, 'w') as f:
-                json.dump({'processed': list(self.processed_hashes)}, f)
+            fcntl.ioctl(dst, self.FICLONE, src)
+            return True
+        except OSError as e:
+            if e.errno in self.UNSUPPORTED:
+                return False
+            raise
+
+    def _copy(self, src: int, dst: int, size: int):
+        """
+        Copy in chunks inside the kernel, resuming after what an earlier,
+        interrupted attempt already wrote to dst.
+        """
+        offset = os.fstat(dst).st_size
+        if offset > size:
+            os.ftruncate(dst, 0)
+            offset = 0
+        use_copy_file_range = hasattr(os, 'copy_file_range')
+
+        while offset < size:
+            count = min(self.chunk_size, size - offset)
+            if use_copy_file_range:
+                try:
+                    written = os.copy_file_range(src, dst, count, offset, offset)
+                except OSError as e:
+                    if e.errno not in self.UNSUPPORTED:
+                        raise
+                    use_copy_file_range = False
+                    continue
+            else:
+                os.lseek(dst, offset, os.SEEK_SET)
+                written = os.sendfile(dst, src, offset, count)
+            if written == 0:
+                raise OSError(errno.EIO, f"source ended at {offset} of {size} bytes")
+            offset += written
+
+
+class PollScheduler:
+    """
+    ETA-aware delay before the next qBittorrent sync.
+    Uses the eta/progress/state fields already in the torrent table to wake
+    shortly before the next expected completion, polls tightly while a
+    torrent above 99% is transferring and backs off exponentially while
+    nothing is downloading. Stalled and queued torrents have no usable ETA.
+    """
+
+    ETA_INFINITY = 8640000  # qBittorrent's "unknown" ETA
+    NEAR_COMPLETE = 0.99
+    INACTIVE_STATES = frozenset({'pausedDL', 'stoppedDL', 'error', 'missingFiles', 'unknown'})
+    DOWNLOADING_STATES = frozenset({'downloading', 'forcedDL'})
+
+    def __init__(self, base: float, minimum: float = POLL_MIN_INTERVAL,
+                 maximum: float = POLL_MAX_INTERVAL, lead: float = POLL_LEAD):
+        self.base = base
+        self.minimum = minimum
+        self.maximum = max(maximum, base)
+        self.lead = lead  # Seconds to wake before the ETA
+        self.idle_interval = 0.0
+
+    def next_interval(self, torrents: Iterable[Dict]) -> float:
+        soonest = None
+        near_complete = False
+        active = False
+
+        for torrent in torrents:
+            progress = torrent.get('progress', 0)
+            if progress >= 1.0 or torrent.get('state') in self.INACTIVE_STATES:
+                continue
+            active = True
+            if (torrent.get('state') not in self.DOWNLOADING_STATES
+                    and not torrent.get('dlspeed', 0)):
+                continue  # Stalled, queued or still checking: poll at base
+            if progress >= self.NEAR_COMPLETE:
+                near_complete = True
+            eta = torrent.get('eta', self.ETA_INFINITY)
+            if 0 <= eta < self.ETA_INFINITY and (soonest is None or eta < soonest):
+                soonest = eta
+
+        if not active:
+            # Idle: double the interval up to the maximum
+            self.idle_interval = min(self.maximum, self.idle_interval * 2 or self.base)
+            return self.idle_interval
+        self.idle_interval = 0.0
+
+        if near_complete:
+            return self.minimum
+        if soonest is None:
+            # Downloading without a usable ETA (stalled, metadata)
+            return self.base
+        return min(self.maximum, max(self.minimum, soonest - self.lead))
+
+
+class PlexMonitor:
+    def __init__(self, dry_run: bool = False, index_in_background: bool = True):
+        # A dry run reads state but never creates, migrates or writes it
+        self.dry_run = dry_run
+        # One-shot runs build a missing library index before linking anything
+        self.index_in_background = index_in_background
+        self.state = open_state_store(read_only=dry_run)
+        self.processed_hashes: Set[str] = self.load_state()
+        # Held while the set is iterated or replaced; hashes are added from io threads
+        self.processed_lock = threading.Lock()
+        self.plex_token: Optional[str] = self.load_plex_token()
+        self.qbittorrent = QBittorrentClient()
+        self.plex = PlexClient(token=self.plex_token)
+        self.sync = TorrentSyncEngine(self.qbittorrent)
+        self.classifier = MediaClassifier()
+        self.link_pool = ThreadPoolExecutor(max_workers=LINK_WORKERS, thread_name_prefix="link")
+        # Blocking HTTP, state and planning work offloaded from the event loop
+        self.io_pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix="io")
+        self.destination_locks = DirectoryLocks()
+        self.index_builder: Optional[threading.Thread] = None
+        self.index_stop = threading.Event()
+        self.library_index: Optional[LibraryIndex] = None if dry_run else self.open_library_index()
+        self.linker = HardlinkEngine(index=self.library_index)
+        self.refresher = RefreshScheduler(self.scan_plex_library)
+        self.intake: Optional[CompletionIntake] = None if dry_run else self.open_intake()
+        self.register_state_metrics()
+
+        # Event loop state (see run_async)
+        self.in_flight: Set[str] = set()   # Hashes being planned or linked
+        self.jobs: Set[asyncio.Task] = set()
+        self.backlog = BacklogQueue()
+        self.backlog_ready: Optional[asyncio.Event] = None
+        self.wake: Optional[asyncio.Event] = None
+        self.refresh_wake: Optional[asyncio.Event] = None
+
+        # When set, mark_processed collects records here instead of saving them
+        # one by one; the backfill commits them per batch (see Backfill)
+        self.deferred_records: Optional[Dict[str, Dict]] = None
+
+    def register_state_metrics(self):
+        """Point the state size gauges, evaluated at scrape time, at this monitor"""
+        STATE_HASHES.function = lambda: len(self.processed_hashes)
+        STATE_DISK_BYTES.function = self.state.disk_usage
+        TORRENTS_TRACKED.function = lambda: len(self.sync.torrents)
+
+    def open_library_index(self) -> Optional[LibraryIndex]:
+        """Open the library inode index, building it on first use"""
+        if not LIBRARY_INDEX_DB:
+            return None
+        try:
+            index = LibraryIndex(Path(LIBRARY_INDEX_DB))
         except Exception as e:
-            logger.error(f"Failed to save state: {e}")
+            logger.warning(f"Library index disabled: {e}")
+            return None
+        if index.is_built():
+            return index
+        if self.index_in_background:
+            # Lookups simply miss until the first walk is done
+            self.index_builder = threading.Thread(target=self.build_library_index, args=(index,),
+                                                  name="library-index", daemon=True)
+            self.index_builder.start()
+        else:
+            self.build_library_index(index)
+        return index
+
+    def build_library_index(self, index: LibraryIndex):
+        """Walk MOVIES_DIR and TV_DIR into the library index"""
+        start = time.monotonic()
+        try:
+            count = index.build([MOVIES_DIR, TV_DIR], stop=self.index_stop)
+        except Exception as e:
+            logger.error(f"Failed to build library index: {e}")
+            return
+        if count is None:
+            logger.info("Library index walk interrupted, resuming on next start")
+            return
+        logger.info(f"Indexed {count} library files in {time.monotonic() - start:.1f}s")
+        index.report_duplicates()
+
+    def open_intake(self) -> Optional[CompletionIntake]:
+        """Open the completion hook spool directory"""
+        try:
+            return CompletionIntake(INTAKE_DIR)
+        except Exception as e:
+            logger.warning(f"Completion intake disabled, polling only: {e}")
+            return None
+
+    def load_state(self) -> Set[str]:
+        """Load previously processed torrent hashes"""
+        try:
+            return self.state.load()
+        except Exception as e:
+            logger.warning(f"Failed to load state: {e}")
+        return set()
+
+    def state_footprint(self) -> Dict[str, int]:
+        """Memory and disk used by processed state, plus process RSS"""
+        with self.processed_lock:
+            hashes = len(self.processed_hashes)
+            memory = sys.getsizeof(self.processed_hashes)
+            memory += sum(sys.getsizeof(h) for h in self.processed_hashes)
+        rss = 0
+        try:
+            with open('/proc/self/statm') as f:
+                rss = int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+        except Exception:
+            pass
+        return {
+            'hashes': hashes,
+            'memory': memory,
+            'disk': self.state.disk_usage(),
+            'rss': rss,
+        }
+
+    def collect_garbage(self):
+        """
+        Reconcile processed state with qBittorrent and expire hashes of
+        torrents that have been gone for longer than STATE_RETENTION_DAYS.
+        """
+        # Only trust a complete torrent table
+        if self.sync.rid == 0:
+            return
+        with self.sync.lock:
+            present = set(self.sync.torrents)
+        if not present and self.processed_hashes:
+            logger.warning("qBittorrent reports no torrents, skipping state reconciliation")
+            return
+
+        before = self.state_footprint()
+        expire_before = time.time() - STATE_RETENTION_DAYS * 86400
+        try:
+            expired = self.state.reconcile(present, expire_before)
+        except Exception as e:
+            logger.error(f"State reconciliation failed: {e}")
+            return
+
+        if expired:
+            # Rebuild the set so its hash table shrinks as well
+            with self.processed_lock:
+                self.processed_hashes = self.processed_hashes.difference(expired)
+        after = self.state_footprint()
+
+        def fmt(footprint: Dict[str, int]) -> str:
+            return (f"{footprint['hashes']} hashes, {footprint['memory'] // 1024} KiB memory, "
+                    f"{footprint['disk'] // 1024} KiB disk, {footprint['rss'] // 1048576} MiB RSS")
+
+        logger.info(f"🧹 State reconciliation expired {len(expired)} hashes")
+        logger.info(f"   Before: {fmt(before)}")
+        logger.info(f"   After:  {fmt(after)}")
+
+        if self.library_index is not None:
+            self.library_index.report_duplicates()
 
     def load_plex_token(self) -> Optional[str]:
         """Load Plex authentication token"""
@@ -83,109 +1959,64 @@ class PlexMonitor:
         return None
 
     def get_completed_torrents(self) -> list:
-        """Get list of completed torrents from qBittorrent"""
-        try:
-            response = self.session.get(f"{QBITTORRENT_URL}/api/v2/torrents/info")
-            response.raise_for_status()
-            torrents = response.json()
+        """Copies of all completed torrents known to the sync engine"""
+        with self.sync.lock:
+            return [dict(self.sync.torrents[h]) for h in self.sync.completed]
 
-            # Filter completed torrents (progress = 1.0)
-            completed = [t for t in torrents if t.get('progress', 0) == 1.0]
-            return completed
-        except Exception as e:
-            logger.error(f"Failed to get torrents: {e}")
-            return []
+    def get_pending_torrents(self) -> list:
+        """Copies of completed torrents that are neither processed nor in flight"""
+        with self.sync.lock:
+            return [dict(self.sync.torrents[h]) for h in self.sync.completed
+                    if h not in self.processed_hashes and h not in self.in_flight]
 
-    def is_movie(self, name: str, content_path: str) -> bool:
-        """Detect if content is a movie"""
-        import re
-
-        # Video file extensions (including Bluray formats)
-        video_extensions = ('.mkv', '.mp4', '.avi', '.mov', '.wmv', '.m4v', '.mpg', '.mpeg', '.iso', '.m2ts', '.ts')
-
-        # First check: Year pattern with flexible separators
-        year_patterns = [
-            r'\(19\d{2}\)',  # (1964), (2007)
-            r'\(20\d{2}\)',  # (2010), (2024)
-            r'[.\-\s](19\d{2})[.\-\s]',  # .1964., -1985-
-            r'[.\-\s](20\d{2})[.\-\s]',  # .2007., -2010-
-            r'[.\-\s](19\d{2})$',  # ends with year
-            r'[.\-\s](20\d{2})$',  # ends with year
-        ]
-
-        has_year = any(re.search(pattern, name) for pattern in year_patterns)
-
-        # Check if it's a TV show first (to exclude from movie detection)
-        if self.is_tv_show(name, content_path):
+    def classify_torrent(self, name: str, snapshot: ContentSnapshot) -> Classification:
+        """
+        Classify a torrent once from its name and content snapshot.
+        TV shows are detected from the name or from first-level file names,
+        movies are anything else with video content.
+        """
+        with STAGE_SECONDS.time(stage="is_tv_show"):
+            result = self.classifier.classify(name)
+            is_tv = result.media_type == 'tv' or self._has_episode_files(snapshot)
+
+        if not is_tv:
+            with STAGE_SECONDS.time(stage="is_movie"):
+                if snapshot.has_video_content:
+                    return Classification('movie', None, None)
+                return Classification(None, None, None)
+
+        show_name, season_num = self.extract_show_info(name, snapshot, result)
+        return Classification('tv', show_name, season_num, result.has_episode)
+
+    def _has_episode_files(self, snapshot: Optional[ContentSnapshot]) -> bool:
+        """Check first-level file names for S##E## markers"""
+        if not (snapshot and snapshot.is_dir):
             return False
-
-        # If has year, check for video content
-        if has_year:
-            if any(content_path.lower().endswith(ext) for ext in video_extensions):
+        for f, result in zip(snapshot.top_level_files,
+                             self.classifier.classify_many(snapshot.top_level_files)):
+            if result.has_episode:
+                logger.debug(f"Detected TV show from file: {f}")
                 return True
-            if os.path.isdir(content_path):
-                try:
-                    for root, dirs, files in os.walk(content_path):
-                        if any(f.lower().endswith(video_extensions) for f in files):
-                            return True
-                        if any(d in ['BDMV', 'VIDEO_TS', 'STREAM'] for d in dirs):
-                            return True
-                except Exception:
-                    pass
-
-        # Fallback: No year but is a video file -> assume it's a movie
-        # This handles files like "Coraline.mkv" or "MovieName.mp4"
-        if any(content_path.lower().endswith(ext) for ext in video_extensions):
-            return True
-
-        # Fallback: Directory with video files -> assume it's a movie
-        if os.path.isdir(content_path):
-            try:
-                for root, dirs, files in os.walk(content_path):
-                    if any(f.lower().endswith(video_extensions) for f in files):
-                        return True
-                    if any(d in ['BDMV', 'VIDEO_TS', 'STREAM'] for d in dirs):
-                        return True
-            except Exception:
-                pass
-
         return False
 
-    def is_tv_show(self, name: str, content_path: str = None) -> bool:
+    def is_movie(self, name: str, snapshot: ContentSnapshot) -> bool:
+        """Detect if content is a movie"""
+        return self.classify_torrent(name, snapshot).media_type == 'movie'
+
+    def is_tv_show(self, name: str, snapshot: Optional[ContentSnapshot] = None) -> bool:
         """
         Detect if content is a TV show.
         Checks both torrent name and file contents for season/episode patterns.
         """
-        import re
-
-        # Check for season/episode patterns in name
-        patterns = [
-            r'[Ss]\d{2}[Ee]\d{2}',  # S01E01
-            r'\d{1,2}x\d{2}',       # 1x01
-            r'[Ss]\d{2}[^Ee]',      # S01 (season pack without episode)
-            r'[Ss]eason\s*\d{1,2}', # Season 01, season 1
-        ]
-
-        if any(re.search(pattern, name) for pattern in patterns):
+        if self.classifier.classify(name).media_type == 'tv':
             return True
 
         # Fallback: Check file contents if torrent name doesn't match
         # This handles torrents named "Show Name Season 1 Complete"
-        if content_path and os.path.isdir(content_path):
-            try:
-                for root, dirs, files in os.walk(content_path):
-                    for f in files:
-                        if any(re.search(r'[Ss]\d{2}[Ee]\d{2}', f) for _ in [1]):
-                            logger.debug(f"Detected TV show from file: {f}")
-                            return True
-                    # Only check first level to avoid deep recursion
-                    break
-            except Exception as e:
-                logger.debug(f"Error checking files: {e}")
-
-        return False
+        return self._has_episode_files(snapshot)
 
-    def extract_show_info(self, name: str, content_path: str = None) -> tuple:
+    def extract_show_info(self, name: str, snapshot: Optional[ContentSnapshot] = None,
+                          result: Optional[Classification] = None) -> tuple:
         """
         Extract show name and season number from filename.
         Returns: (show_name, season_number)
@@ -197,251 +2028,708 @@ class PlexMonitor:
           Friends.1x05.mkv -> ("Friends", "01")
           Shameless Season 1 Complete -> ("Shameless", "01")
         """
-        import re
-
-        # Try S##E## format first (most common)
-        season_match = re.search(r'[Ss](\d{2})[Ee]\d{2}', name)
-        if season_match:
-            season_num = season_match.group(1)
-            show_name = name[:season_match.start()]
-            show_name = re.sub(r'[._-]+$', '', show_name)
-            show_name = show_name.replace('.', ' ').replace('_', ' ').strip()
-            return (show_name, season_num)
-
-        # Try S## only (season pack without episode number)
-        season_match = re.search(r'[Ss](\d{2})', name)
-        if season_match:
-            season_num = season_match.group(1)
-            show_name = name[:season_match.start()]
-            show_name = re.sub(r'[._-]+$', '', show_name)
-            show_name = show_name.replace('.', ' ').replace('_', ' ').strip()
-            return (show_name, season_num)
-
-        # Try #x## format
-        season_match = re.search(r'(\d{1,2})x\d{2}', name)
-        if season_match:
-            season_num = season_match.group(1).zfill(2)
-            show_name = name[:season_match.start()]
-            show_name = re.sub(r'[._-]+$', '', show_name)
-            show_name = show_name.replace('.', ' ').replace('_', ' ').strip()
-            return (show_name, season_num)
-
-        # Try "Season X" format
-        season_match = re.search(r'[Ss]eason\s*(\d{1,2})', name)
-        if season_match:
-            season_num = season_match.group(1).zfill(2)
-            show_name = name[:season_match.start()]
-            show_name = re.sub(r'[._-]+$', '', show_name)
-            show_name = show_name.replace('.', ' ').replace('_', ' ').strip()
-            return (show_name, season_num)
-
-        # Fallback: Check first file in directory
-        if content_path and os.path.isdir(content_path):
-            try:
-                for root, dirs, files in os.walk(content_path):
-                    for f in files:
-                        if f.lower().endswith(('.mkv', '.mp4', '.avi')):
-                            # Try to extract from first video file
-                            result = self.extract_show_info(f)
-                            if result[0] is not None:
-                                logger.info(f"Extracted show info from file: {f}")
-                                return result
-                    break
-            except Exception:
-                pass
+        with STAGE_SECONDS.time(stage="extract_show_info"):
+            return self._extract_show_info(name, snapshot, result)
+
+    def _extract_show_info(self, name: str, snapshot: Optional[ContentSnapshot],
+                           result: Optional[Classification]) -> tuple:
+        if result is None:
+            result = self.classifier.classify(name)
+        if result.season is not None:
+            return (result.show_name, result.season)
+
+        # Fallback: Check first video file in directory
+        if snapshot and snapshot.is_dir:
+            for f in snapshot.top_level_files:
+                if f.lower().endswith(('.mkv', '.mp4', '.avi')):
+                    file_result = self.classifier.classify(f)
+                    if file_result.season is not None:
+                        logger.info(f"Extracted show info from file: {f}")
+                        return (file_result.show_name, file_result.season)
 
         # Fallback: couldn't extract info
         return (None, None)
 
-    def create_hardlink(self, source: Path, target: Path, show_name: str = None, season_num: str = None) -> bool:
+    def create_hardlink(self, source: Path, target: Path, show_name: str = None, season_num: str = None,
+                        snapshot: Optional[ContentSnapshot] = None) -> LinkSummary:
         """
         Create hardlink from source to target.
         For TV shows, organizes into Show Name/Season XX/ structure.
+        Returns a summary of linked, skipped and failed files.
         """
         try:
+            if snapshot is None:
+                snapshot = ContentSnapshot.scan(str(source))
+
             # Ensure source exists
-            if not source.exists():
+            if not snapshot.exists:
                 logger.error(f"Source does not exist: {source}")
-                return False
+                return LinkSummary(error="source missing")
 
             # For TV shows, create proper directory structure
             if show_name and season_num:
                 # Create: /TV Shows/Show Name/Season XX/
-                show_dir = target / show_name
-                season_dir = show_dir / f"Season {season_num}"
-                season_dir.mkdir(parents=True, exist_ok=True)
-                target = season_dir
+                target = target / show_name / f"Season {season_num}"
+                self.linker.ensure_dir(str(target))
                 logger.info(f"Organizing into: {show_name}/Season {season_num}/")
+            else:
+                self.linker.ensure_dir(str(target))
 
-            # Ensure target parent directory exists
-            target.parent.mkdir(parents=True, exist_ok=True)
-
-            if source.is_dir():
+            pairs = self.link_pairs(source, snapshot, bool(show_name and season_num))
+            if snapshot.is_dir:
                 # For directories (season packs), create hardlinks for all files
                 logger.info(f"Creating hardlinks for directory: {source.name}")
 
-                # For TV shows, link files directly into season folder (not nested)
                 if show_name and season_num:
-                    for root, dirs, files in os.walk(source):
-                        for f in files:
-                            # Only link video files to avoid clutter
-                            if f.lower().endswith(('.mkv', '.mp4', '.avi', '.mov', '.wmv', '.m4v', '.mpg', '.mpeg')):
-                                src_file = Path(root) / f
-                                tgt_file = target / f
-
-                                if not tgt_file.exists():
-                                    try:
-                                        os.link(src_file, tgt_file)
-                                        logger.debug(f"Linked: {f}")
-                                    except Exception as e:
-                                        logger.warning(f"Failed to link {f}: {e}")
+                    summary = self.linker.link(str(source), str(target), pairs)
                 else:
-                    # Movies: keep original directory structure
                     target_base = target / source.name
-                    target_base.mkdir(parents=True, exist_ok=True)
-
-                    for root, dirs, files in os.walk(source):
-                        rel_root = Path(root).relative_to(source)
-                        target_root = target_base / rel_root
-
-                        # Create subdirectories
-                        for d in dirs:
-                            (target_root / d).mkdir(parents=True, exist_ok=True)
-
-                        # Create hardlinks for files
-                        for f in files:
-                            src_file = Path(root) / f
-                            tgt_file = target_root / f
-
-                            if not tgt_file.exists():
-                                try:
-                                    os.link(src_file, tgt_file)
-                                    logger.debug(f"Linked: {f}")
-                                except Exception as e:
-                                    logger.warning(f"Failed to link {f}: {e}")
-
-                logger.info(f"✅ Directory hardlinked successfully")
-                return True
+                    self.linker.ensure_dir(str(target_base))
+                    for rel_dir in snapshot.dirs:
+                        self.linker.ensure_dir(str(target_base / rel_dir))
+                    summary = self.linker.link(str(source), str(target_base), pairs)
+
+                logger.info(f"✅ Directory hardlinked: {summary}")
+                if summary.failed:
+                    logger.warning(f"Failed to link: {summary.failure_report()}")
+                return summary
             else:
                 # Single file
-                target_file = target / source.name
-                if not target_file.exists():
-                    os.link(source, target_file)
-                    logger.info(f"✅ File hardlinked: {source.name}")
-                return True
+                summary = self.linker.link(str(source.parent), str(target), pairs)
+                if summary.placed:
+                    logger.info(f"✅ File placed: {source.name} ({summary})")
+                if summary.failed:
+                    logger.warning(f"Failed to link: {summary.failure_report()}")
+                return summary
 
         except Exception as e:
             logger.error(f"Failed to create hardlink: {e}")
-            return False
-
-    def scan_plex_library(self, section_id: str, name: str):
-        """Trigger Plex library scan"""
+            return LinkSummary(error=str(e))
+
+    @staticmethod
+    def link_pairs(source: Path, snapshot: ContentSnapshot, tv: bool) -> list:
+        """(source, target) relative names create_hardlink links for this content"""
+        if not snapshot.is_dir:
+            return [(source.name, source.name)]
+        if tv:
+            # TV: link video files directly into season folder (not nested)
+            return [(rel_path, os.path.basename(rel_path)) for rel_path in snapshot.video_files
+                    if rel_path.lower().endswith(ContentSnapshot.EPISODE_EXTENSIONS)]
+        # Movies: keep original directory structure
+        return [(rel_path, rel_path) for rel_path in snapshot.files]
+
+    def scan_plex_library(self, section_id: str, name: str, path: Optional[Path] = None):
+        """Trigger Plex library scan, limited to path when given"""
         if not self.plex_token:
             logger.warning("Plex token not configured, skipping scan")
             return
 
         try:
-            url = f"{PLEX_URL}/library/sections/{section_id}/refresh?X-Plex-Token={self.plex_token}"
-            response = self.session.get(url, timeout=10)
+            response = self.plex.refresh(section_id, path)
+            PLEX_REFRESHES.inc(library=name, scope='full' if path is None else 'path')
 
             if response.status_code == 200:
-                logger.info(f"📺 Triggered Plex scan for {name} library")
+                if path is not None:
+                    logger.info(f"📺 Triggered Plex scan for {name}: {path}")
+                else:
+                    logger.info(f"📺 Triggered Plex scan for {name} library")
             else:
+                PLEX_REFRESH_ERRORS.inc(library=name)
                 logger.warning(f"Failed to scan Plex library: HTTP {response.status_code}")
+        except ServiceUnavailable as e:
+            # Keep the refresh queued until Plex is back
+            logger.debug(f"Deferring Plex scan for {name}: {e}")
+            self.refresher.request(section_id, name, path)
         except Exception as e:
+            PLEX_REFRESH_ERRORS.inc(library=name)
             logger.error(f"Failed to scan Plex library: {e}")
 
-    def process_torrent(self, torrent: Dict):
-        """Process a completed torrent"""
+    def fetch_file_list(self, hash_id: str) -> Optional[list]:
+        """Fetch one torrent's file list, None on failure"""
+        try:
+            return self.qbittorrent.torrent_files(hash_id)
+        except ServiceUnavailable as e:
+            logger.debug(f"Skipping file list for {hash_id}: {e}")
+            return None
+        except Exception as e:
+            logger.warning(f"Failed to get file list for {hash_id}: {e}")
+            return None
+
+    def snapshot_for(self, torrent: Dict, files: Optional[list] = None) -> ContentSnapshot:
+        """Build the content snapshot from file metadata, or scan the disk"""
+        content_path = torrent.get('content_path', '')
+        save_path = torrent.get('save_path', '')
+        if files and save_path:
+            return ContentSnapshot.from_files(content_path, save_path, files)
+        return ContentSnapshot.scan(content_path)
+
+    def plan_torrent(self, torrent: Dict, files: Optional[list] = None) -> Optional[LinkJob]:
+        """
+        Classification stage: decide where a completed torrent goes.
+        Returns None when there is nothing to link.
+        """
+        with log_context(hash=torrent.get('hash', ''), torrent=torrent.get('name', ''),
+                         stage="classify"):
+            return self._plan_torrent(torrent, files)
+
+    def _plan_torrent(self, torrent: Dict, files: Optional[list]) -> Optional[LinkJob]:
         hash_id = torrent.get('hash', '')
         name = torrent.get('name', '')
         content_path = torrent.get('content_path', '')
-        save_path = torrent.get('save_path', '')
 
         # Skip if already processed
         if hash_id in self.processed_hashes:
-            return
+            return None
 
         logger.info(f"Processing: {name}")
 
         # Determine content path
         if not content_path:
             logger.warning(f"No content path for: {name}")
-            return
+            return None
 
         source = Path(content_path)
 
-        # Detect media type and organize
-        processed = False
+        # Build the content snapshot once for classification and linking
+        with STAGE_SECONDS.time(stage="snapshot"):
+            snapshot = self.snapshot_for(torrent, files)
+
+        # Detect media type
+        media = self.classify_torrent(name, snapshot)
 
-        if self.is_movie(name, content_path):
+        if media.media_type == 'movie':
             logger.info(f"🎬 Detected movie: {name}")
-            if self.create_hardlink(source, MOVIES_DIR):
-                self.scan_plex_library(PLEX_MOVIES_SECTION, "Movies")
-                processed = True
+            return LinkJob(hash_id, name, source, MOVIES_DIR, MOVIES_DIR / source.name,
+                           None, None, snapshot, PLEX_MOVIES_SECTION, "Movies",
+                           torrent.get('completion_on', 0), torrent.get('size', 0),
+                           torrent.get('category', ''))
 
-        elif self.is_tv_show(name, content_path):
+        if media.media_type == 'tv':
             logger.info(f"📺 Detected TV show: {name}")
-            # Extract show name and season
-            show_name, season_num = self.extract_show_info(name, content_path)
+            show_name, season_num = media.show_name, media.season
 
             if show_name and season_num:
                 logger.info(f"   Show: {show_name}, Season: {season_num}")
-                if self.create_hardlink(source, TV_DIR, show_name, season_num):
-                    self.scan_plex_library(PLEX_TV_SECTION, "TV Shows")
-                    processed = True
+                destination = TV_DIR / show_name / f"Season {season_num}"
             else:
                 logger.warning(f"Could not extract show info from: {name}")
                 # Fallback: create without proper structure
-                if self.create_hardlink(source, TV_DIR):
-                    self.scan_plex_library(PLEX_TV_SECTION, "TV Shows")
-                    processed = True
+                show_name = season_num = None
+                destination = TV_DIR / source.name
+            return LinkJob(hash_id, name, source, TV_DIR, destination,
+                           show_name, season_num, snapshot, PLEX_TV_SECTION, "TV Shows",
+                           torrent.get('completion_on', 0), torrent.get('size', 0),
+                           torrent.get('category', ''))
+
+        logger.info(f"ℹ️  Media type not detected: {name}")
+        TORRENTS_PROCESSED.inc(media_type='unknown', result='skipped')
+        self.mark_processed(hash_id, {'name': name, 'completed_on': torrent.get('completion_on')})
+        return None
 
-        else:
-            logger.info(f"ℹ️  Media type not detected: {name}")
+    def link_job(self, job: LinkJob) -> LinkSummary:
+        """Linking stage: runs on the worker pool, serialized per destination"""
+        with log_context(hash=job.hash_id, torrent=job.name, stage="link"), \
+                self.destination_locks.hold(job.destination):
+            with HARDLINK_SECONDS.time(library=job.library):
+                return self.create_hardlink(job.source, job.library_dir, job.show_name,
+                                            job.season, job.snapshot)
+
+    def finish_job(self, job: LinkJob, summary: LinkSummary):
+        """Refresh stage: update Plex and record the torrent as processed"""
+        with log_context(hash=job.hash_id, torrent=job.name, stage="record"):
+            self._finish_job(job, summary)
+
+    def _finish_job(self, job: LinkJob, summary: LinkSummary):
+        linked = summary.ok
+        media_type = 'tv' if job.library_dir == TV_DIR else 'movie'
+        link_count = summary.placed + summary.skipped
+        TORRENTS_PROCESSED.inc(media_type=media_type, result='linked' if linked else 'failed')
+        HARDLINK_FILES.inc(summary.linked, library=job.library, result='linked')
+        HARDLINK_FILES.inc(summary.reflinked, library=job.library, result='reflinked')
+        HARDLINK_FILES.inc(summary.copied, library=job.library, result='copied')
+        HARDLINK_FILES.inc(summary.skipped, library=job.library, result='skipped')
+        HARDLINK_FILES.inc(summary.failed, library=job.library, result='failed')
+
+        if linked:
+            if job.completed_on:
+                COMPLETION_LATENCY.observe(max(0.0, time.time() - job.completed_on))
+            self.refresher.request(job.section_id, job.library, self.refresh_path(job))
+
+        self.mark_processed(job.hash_id, {
+            'name': job.name,
+            'media_type': media_type,
+            'destination': str(job.destination),
+            'link_count': link_count,
+            'linked': linked,
+            'completed_on': job.completed_on,
+        })
+
+        if linked:
+            logger.info(f"✅ Successfully organized: {job.name}")
+
+    def refresh_path(self, job: LinkJob) -> Optional[Path]:
+        """Folder Plex has to rescan for a job, None for the whole section"""
+        if job.show_name or job.snapshot.is_dir:
+            return job.destination
+        # Single files are linked straight into the library root
+        return None
+
+    def mark_processed(self, hash_id: str, record: Optional[Dict] = None):
+        """Mark a torrent as processed and persist its record"""
+        with self.processed_lock:
+            self.processed_hashes.add(hash_id)
+        record = dict(record or {}, processed_at=time.time())
+        if self.deferred_records is not None:
+            self.deferred_records[hash_id] = record
+            return
+        try:
+            self.state.add(hash_id, record)
+        except Exception as e:
+            logger.error(f"Failed to save state: {e}")
+
+    def process_torrent(self, torrent: Dict, files: Optional[list] = None):
+        """Process a completed torrent"""
+        job = self.plan_torrent(torrent, files)
+        if job:
+            self.finish_job(job, self.link_job(job))
+
+    async def offload(self, executor, func, *args, timeout: Optional[float] = None):
+        """Run blocking work in an executor, optionally bounded by timeout"""
+        future = asyncio.get_running_loop().run_in_executor(executor, func, *args)
+        if timeout is None:
+            return await future
+        return await asyncio.wait_for(future, timeout)
+
+    async def sync_torrents(self):
+        """Bring the sync engine's torrent table up to date"""
+        try:
+            with SYNC_SECONDS.time():
+                # requests enforces its own timeout; this bounds DNS and retries too
+                await self.offload(self.io_pool, self.sync.poll,
+                                   timeout=self.qbittorrent.deadline)
+        except asyncio.TimeoutError:
+            logger.error("Failed to sync torrents: timed out")
+        except ServiceUnavailable as e:
+            logger.debug(f"Skipping sync: {e}")
+        except Exception as e:
+            logger.error(f"Failed to sync torrents: {e}")
+
+    async def fetch_file_lists_async(self, hashes: list) -> Dict[str, list]:
+        """Fetch file lists for a batch of torrents concurrently"""
+        if CLASSIFY_SOURCE != "metadata" or not hashes:
+            return {}
+
+        async def fetch(hash_id: str):
+            try:
+                return await self.offload(self.io_pool, self.fetch_file_list, hash_id,
+                                          timeout=self.qbittorrent.deadline)
+            except asyncio.TimeoutError:
+                logger.warning(f"Failed to get file list for {hash_id}: timed out")
+                return None
+
+        results = await asyncio.gather(*(fetch(h) for h in hashes))
+        return {h: files for h, files in zip(hashes, results) if files is not None}
+
+    async def check_completions(self):
+        """
+        Sync with qBittorrent and queue unprocessed completions for linking.
+        The work list is derived from the torrent table on every cycle, so a
+        torrent that failed or was skipped is retried on the next sync. Link
+        workers drain the backlog in priority order so the next sync is not
+        held up by them.
+        """
+        with POLL_SECONDS.time():
+            await self.sync_torrents()
+            new_completed = self.get_pending_torrents()
+            if not new_completed:
+                return
+
+            logger.info(f"Found {len(new_completed)} new completed torrents")
+            file_lists = await self.fetch_file_lists_async([t.get('hash') for t in new_completed])
+
+            for torrent in new_completed:
+                hash_id = torrent.get('hash')
+                self.in_flight.add(hash_id)
+                try:
+                    job = await self.offload(self.io_pool, self.plan_torrent, torrent,
+                                             file_lists.get(hash_id))
+                except Exception as e:
+                    logger.error(f"Failed to classify {torrent.get('name')}: {e}")
+                    job = None
+                if job is None:
+                    self.in_flight.discard(hash_id)
+                    continue
+                BACKLOG_DEPTH.inc()
+                self.backlog.push(job)
+            # Wake the workers once the whole batch is queued so priorities apply across it
+            if self.backlog:
+                self.backlog_ready.set()
+
+    async def link_worker(self):
+        """Take the highest-priority job from the backlog and link it"""
+        while True:
+            while not self.backlog:
+                self.backlog_ready.clear()
+                await self.backlog_ready.wait()
+            job, waited = self.backlog.pop()
+            QUEUE_WAIT.observe(waited)
+            if waited >= 1:
+                logger.info(f"Linking {job.name} after {waited:.0f}s in the backlog")
+            task = asyncio.create_task(self.link_and_finish(job))
+            self.jobs.add(task)
+            task.add_done_callback(self.jobs.discard)
+            # Shielded so shutdown can let the running job finish
+            await asyncio.shield(task)
+
+    async def link_and_finish(self, job: LinkJob):
+        """Link on the worker pool, then record the result off the event loop"""
+        try:
+            try:
+                summary = await self.offload(self.link_pool, self.link_job, job)
+            except Exception as e:
+                logger.error(f"Link job failed for {job.name}: {e}")
+                summary = LinkSummary(error=str(e))
+            BACKLOG_DEPTH.dec()
+            await self.offload(self.io_pool, self.finish_job, job, summary)
+        finally:
+            self.in_flight.discard(job.hash_id)
+
+    async def sync_loop(self):
+        """Sync with qBittorrent on the adaptive schedule or when woken by the hook"""
+        # With the completion hook active, polling is only a fallback and may
+        # back off further while idle
+        scheduler = PollScheduler(
+            POLL_INTERVAL,
+            maximum=RECONCILE_INTERVAL if self.intake else POLL_MAX_INTERVAL
+        )
+        next_gc = time.monotonic() + min(STATE_GC_INTERVAL, 3600)
+
+        while True:
+            self.wake.clear()
+            try:
+                await self.check_completions()
+
+                # Periodically forget torrents removed from qBittorrent
+                if time.monotonic() >= next_gc:
+                    await self.offload(self.io_pool, self.collect_garbage)
+                    next_gc = time.monotonic() + STATE_GC_INTERVAL
+            except Exception as e:
+                logger.error(f"Error in main loop: {e}")
+
+            try:
+                with self.sync.lock:
+                    torrents = list(self.sync.torrents.values())
+                interval = scheduler.next_interval(torrents)
+            except Exception as e:
+                logger.error(f"Failed to schedule the next sync: {e}")
+                interval = POLL_INTERVAL
+            # Do not poll into an open circuit
+            interval = max(interval, self.qbittorrent.breaker.remaining())
+            POLL_INTERVAL_GAUGE.set(interval)
+            try:
+                await asyncio.wait_for(self.wake.wait(), interval)
+            except asyncio.TimeoutError:
+                pass
 
-        # Mark as processed
-        self.processed_hashes.add(hash_id)
-        self.save_state()
+    async def refresh_loop(self):
+        """Send coalesced Plex refreshes once their window has expired"""
+        while True:
+            deadline = self.refresher.next_deadline()
+            timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+            try:
+                await asyncio.wait_for(self.refresh_wake.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+            self.refresh_wake.clear()
+            await self.send_refreshes(self.refresher.pop_due())
 
-        if processed:
-            logger.info(f"✅ Successfully organized: {name}")
+    async def send_refreshes(self, calls: list):
+        """Issue Plex refresh requests concurrently"""
+        if not calls:
+            return
+        results = await asyncio.gather(
+            *(self.offload(self.io_pool, self.scan_plex_library, *call, timeout=self.plex.deadline)
+              for call in calls),
+            return_exceptions=True
+        )
+        for call, result in zip(calls, results):
+            if isinstance(result, asyncio.TimeoutError):
+                PLEX_REFRESH_ERRORS.inc(library=call[1])
+                logger.error(f"Failed to scan Plex library: {call[1]} timed out")
+
+    async def watch_intake(self):
+        """Collect hashes from the completion hook and wake the sync loop"""
+        loop = asyncio.get_running_loop()
+        fd = self.intake.inotify_fd
+        if fd is None:
+            while True:
+                await self.drain_intake()
+                await asyncio.sleep(1)
+
+        ready = asyncio.Event()
+
+        def on_readable():
+            try:
+                os.read(fd, 65536)
+            except BlockingIOError:
+                pass
+            ready.set()
 
-    def run(self):
-        """Main daemon loop"""
+        loop.add_reader(fd, on_readable)
+        try:
+            while True:
+                await self.drain_intake()
+                await ready.wait()
+                ready.clear()
+        finally:
+            loop.remove_reader(fd)
+
+    async def drain_intake(self):
+        hashes = await self.offload(self.io_pool, self.intake.drain)
+        if hashes:
+            logger.info(f"Completion hook reported {len(hashes)} torrent(s)")
+            self.wake.set()
+
+    def run(self) -> int:
+        """Main daemon entry point, returns the exit status"""
+        return asyncio.run(self.run_async())
+
+    async def run_async(self) -> int:
+        """
+        Run sync, intake and refresh tasks until SIGTERM/SIGINT. If one of
+        them dies the daemon shuts down with status 1 so systemd restarts it
+        instead of silently running without it.
+        """
         logger.info("=" * 60)
         logger.info("🚀 Plex Monitor Daemon Started")
         logger.info(f"Monitoring qBittorrent at: {QBITTORRENT_URL}")
         logger.info(f"Movies directory: {MOVIES_DIR}")
         logger.info(f"TV Shows directory: {TV_DIR}")
-        logger.info(f"Poll interval: {POLL_INTERVAL} seconds")
+        logger.info(f"Link workers: {LINK_WORKERS} (backlog order: {self.backlog.order})")
+        logger.info(f"Plex refresh delay: {PLEX_REFRESH_DELAY} seconds")
+        logger.info(f"State retention: {STATE_RETENTION_DAYS} days after removal")
+        if self.intake:
+            logger.info(f"Completion intake: {INTAKE_DIR}")
+            logger.info(f"Poll interval: {POLL_MIN_INTERVAL}-{RECONCILE_INTERVAL} seconds (adaptive)")
+        else:
+            logger.info(f"Poll interval: {POLL_MIN_INTERVAL}-{POLL_MAX_INTERVAL} seconds (adaptive)")
+        if start_metrics_server():
+            logger.info(f"Metrics endpoint: http://{METRICS_ADDR}:{METRICS_PORT}/metrics")
         logger.info("=" * 60)
 
-        while True:
-            try:
-                # Get completed torrents
-                torrents = self.get_completed_torrents()
-
-                if torrents:
-                    new_completed = [t for t in torrents if t.get('hash') not in self.processed_hashes]
+        loop = asyncio.get_running_loop()
+        stop = asyncio.Event()
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            loop.add_signal_handler(sig, stop.set)
 
-                    if new_completed:
-                        logger.info(f"Found {len(new_completed)} new completed torrents")
+        self.wake = asyncio.Event()
+        self.refresh_wake = asyncio.Event()
+        self.backlog_ready = asyncio.Event()
+        # finish_job runs on the io pool, so wake the refresh loop thread-safely
+        self.refresher.on_request = lambda: loop.call_soon_threadsafe(self.refresh_wake.set)
 
-                        for torrent in new_completed:
-                            self.process_torrent(torrent)
+        tasks = [
+            asyncio.create_task(self.sync_loop(), name="sync"),
+            asyncio.create_task(self.refresh_loop(), name="refresh"),
+        ]
+        tasks += [asyncio.create_task(self.link_worker(), name=f"link-{n}")
+                  for n in range(LINK_WORKERS)]
+        if self.intake:
+            tasks.append(asyncio.create_task(self.watch_intake(), name="intake"))
+
+        stopping = asyncio.create_task(stop.wait(), name="stop")
+        done, _ = await asyncio.wait([stopping, *tasks], return_when=asyncio.FIRST_COMPLETED)
+        status = 0
+        for task in done:
+            if task is stopping:
+                continue
+            status = 1
+            error = None if task.cancelled() else task.exception()
+            logger.error(f"Task {task.get_name()} stopped unexpectedly: {error!r}",
+                         exc_info=error)
+        if status:
+            logger.error("Shutting down so the service is restarted")
+        else:
+            logger.info("Shutting down gracefully...")
+        stopping.cancel()
+        await self.shutdown(tasks)
+        return status
+
+    async def shutdown(self, tasks: list):
+        """Cancel background tasks, let link jobs finish and flush state"""
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+        if self.jobs:
+            logger.info(f"Waiting for {len(self.jobs)} link job(s) to finish")
+            _, pending = await asyncio.wait(set(self.jobs), timeout=SHUTDOWN_TIMEOUT)
+            for task in pending:
+                task.cancel()
+
+        if self.backlog:
+            logger.info(f"{len(self.backlog)} queued torrent(s) will be linked after restart")
+
+        await self.send_refreshes(self.refresher.pop_due(force=True))
+        self.close()
+
+    def close(self):
+        """Stop the worker pools and close the state store and library index"""
+        self.link_pool.shutdown(wait=True)
+        self.io_pool.shutdown(wait=True)
+        self.state.close()
+        if self.index_builder is not None:
+            self.index_stop.set()
+            self.index_builder.join()
+        if self.library_index is not None:
+            self.library_index.close()
+
+
+class Backfill:
+    """
+    One-shot reconcile of every completed torrent against the libraries.
+    Torrents are classified and linked in batches. State is committed once
+    per batch, so an interrupted run resumes after the last finished batch.
+    Plex is refreshed once per section at the end.
+    """
+
+    def __init__(self, monitor: PlexMonitor, batch_size: int = 100, dry_run: bool = False,
+                 limit: Optional[int] = None):
+        self.monitor = monitor
+        self.batch_size = max(1, batch_size)
+        self.dry_run = dry_run
+        self.limit = limit
+        self.totals = {'torrents': 0, 'linked': 0, 'failed': 0, 'skipped': 0, 'files': 0}
+
+    def pending(self) -> list:
+        """Completed torrents not yet in the state store, oldest first"""
+        monitor = self.monitor
+        monitor.sync.reset()
+        monitor.sync.poll()
+        torrents = [t for t in monitor.get_completed_torrents()
+                    if t.get('hash') not in monitor.processed_hashes]
+        torrents.sort(key=lambda t: t.get('completion_on') or 0)
+        if self.limit is not None:
+            torrents = torrents[:self.limit]
+        return torrents
+
+    def run(self) -> int:
+        """Reconcile everything; returns the number of failed torrents"""
+        monitor = self.monitor
+        torrents = self.pending()
+        total = len(torrents)
+        logger.info(f"Backfill: {total} completed torrents not yet processed"
+                    f"{' (dry run)' if self.dry_run else ''}")
+        if not total:
+            return 0
+
+        # Collapse everything queued during the run into one refresh per section
+        monitor.refresher.max_paths = 0
+        started = time.monotonic()
+        try:
+            for start in range(0, total, self.batch_size):
+                self.run_batch(torrents[start:start + self.batch_size])
+                self.report(start + self.batch_size, total, started)
+        except KeyboardInterrupt:
+            logger.warning("Backfill interrupted; progress up to the last batch is saved")
+            raise
+        finally:
+            if not self.dry_run:
+                monitor.refresher.flush_due(force=True)
+
+        elapsed = time.monotonic() - started
+        logger.info(
+            f"Backfill finished in {elapsed:.1f}s: {self.totals['linked']} "
+            f"{'to link' if self.dry_run else 'linked'}, "
+            f"{self.totals['skipped']} skipped, {self.totals['failed']} failed, "
+            f"{self.totals['files']} files"
+        )
+        return self.totals['failed']
+
+    def run_batch(self, torrents: list):
+        monitor = self.monitor
+        monitor.deferred_records = {}
+        try:
+            hashes = [t.get('hash') for t in torrents]
+            file_lists = {}
+            if CLASSIFY_SOURCE == "metadata":
+                fetched = monitor.io_pool.map(monitor.fetch_file_list, hashes)
+                file_lists = {h: files for h, files in zip(hashes, fetched) if files is not None}
+
+            jobs = []
+            for torrent in torrents:
+                job = monitor.plan_torrent(torrent, file_lists.get(torrent.get('hash')))
+                self.totals['torrents'] += 1
+                if job is None:
+                    self.totals['skipped'] += 1
+                elif self.dry_run:
+                    pairs = monitor.link_pairs(job.source, job.snapshot, bool(job.show_name and job.season))
+                    logger.info(f"   Would link {len(pairs)} file(s) into {job.destination}")
+                    self.totals['linked'] += 1
+                else:
+                    jobs.append(job)
+            jobs.sort(key=monitor.backlog.priority)
 
-                # Sleep before next poll
-                time.sleep(POLL_INTERVAL)
+            futures = {monitor.link_pool.submit(monitor.link_job, job): job for job in jobs}
+            for future in as_completed(futures):
+                job = futures[future]
+                try:
+                    summary = future.result()
+                except Exception as e:
+                    logger.error(f"Link job failed for {job.name}: {e}")
+                    summary = LinkSummary(error=str(e))
+                monitor.finish_job(job, summary)
+                self.totals['linked' if summary.ok else 'failed'] += 1
+                self.totals['files'] += summary.placed
+        finally:
+            # Checkpoint whatever finished, even when interrupted mid-batch
+            records, monitor.deferred_records = monitor.deferred_records, None
+            if records and not self.dry_run:
+                monitor.state.add_many(records)
+
+    def report(self, done: int, total: int, started: float):
+        done = min(done, total)
+        elapsed = max(time.monotonic() - started, 1e-6)
+        rate = done / elapsed
+        remaining = (total - done) / rate if rate else 0
+        logger.info(
+            f"Backfill progress: {done}/{total} ({done * 100 // total}%), "
+            f"{rate:.1f} torrents/s, {self.totals['files'] / elapsed:.1f} files/s, "
+            f"~{remaining:.0f}s remaining"
+        )
+
+
+def main(argv: Optional[list] = None) -> int:
+    parser = argparse.ArgumentParser(description="Link completed qBittorrent downloads into Plex libraries")
+    commands = parser.add_subparsers(dest="command")
+    commands.add_parser("run", help="Run the monitor daemon (default)")
+    reconcile = commands.add_parser(
+        "reconcile", help="Backfill every completed torrent not yet processed, then exit"
+    )
+    reconcile.add_argument("--dry-run", action="store_true",
+                           help="Classify and report destinations without linking or saving state")
+    reconcile.add_argument("--batch-size", type=int, default=100,
+                           help="Torrents per batch; state is checkpointed after each (default: 100)")
+    reconcile.add_argument("--limit", type=int, default=None,
+                           help="Process at most this many torrents")
+    args = parser.parse_args(argv)
+
+    dry_run = args.command == "reconcile" and args.dry_run
+    monitor = PlexMonitor(dry_run=dry_run, index_in_background=args.command != "reconcile")
+    if args.command == "reconcile":
+        try:
+            failed = Backfill(monitor, args.batch_size, args.dry_run, args.limit).run()
+        except KeyboardInterrupt:
+            return 130
+        except Exception as e:
+            logger.error(f"Backfill failed: {e}")
+            return 2
+        finally:
+            monitor.close()
+        return 1 if failed else 0
 
-            except KeyboardInterrupt:
-                logger.info("Shutting down gracefully...")
-                break
-            except Exception as e:
-                logger.error(f"Error in main loop: {e}")
-                time.sleep(POLL_INTERVAL)
+    return monitor.run()
 
 
 if __name__ == "__main__":
-    monitor = PlexMonitor()
-    monitor.run()
+    sys.exit(main())
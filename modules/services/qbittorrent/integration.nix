@@ -16,13 +16,26 @@ in {
       wants = ["qbittorrent.service" "plex.service"];
       wantedBy = ["multi-user.target"];
 
-      environment = {
-        QBITTORRENT_URL = "http://localhost:${toString cfg.port}";
-        PLEX_URL = "http://localhost:32400";
-        PLEX_MOVIES_SECTION = "1";
-        PLEX_TV_SECTION = "2";
-        POLL_INTERVAL = "30"; # Check every 30 seconds
-      };
+      environment =
+        {
+          QBITTORRENT_URL = "http://localhost:${toString cfg.port}";
+          PLEX_URL = "http://localhost:32400";
+          PLEX_MOVIES_SECTION = "1";
+          PLEX_TV_SECTION = "2";
+          POLL_INTERVAL = "30"; # Check every 30 seconds
+          INTAKE_DIR = "${cfg.dataDir}/completed.d"; # Fed by completion-handler.sh
+          RECONCILE_INTERVAL = "300"; # Fallback poll while the intake is active
+          LINK_WORKERS = "4"; # Torrents linked in parallel
+          QUEUE_ORDER = "size"; # Small episodes ahead of large remuxes
+          PLEX_REFRESH_DELAY = "10"; # Coalesce library refreshes over this window
+          METRICS_PORT = "9561"; # Prometheus /metrics on localhost
+          SHUTDOWN_TIMEOUT = "60"; # Let running link jobs finish on stop
+          LOG_FILE = "/var/log/plex-monitor/plex-monitor.log"; # Rotated inside LogsDirectory
+        }
+        // lib.optionalAttrs (cfg.webUI.passwordFile != null) {
+          QBITTORRENT_USERNAME = cfg.webUI.username;
+          QBITTORRENT_PASSWORD_FILE = toString cfg.webUI.passwordFile;
+        };
 
       serviceConfig = {
         Type = "simple";
@@ -31,6 +44,9 @@ in {
         ExecStart = "${pkgs.python3.withPackages (ps: with ps; [requests])}/bin/python3 ${../qbittorrent-scripts/plex-monitor-daemon.py}";
         Restart = "always";
         RestartSec = "10s";
+        TimeoutStopSec = "90s";
+        # Owned by the service user so log rotation can rename files
+        LogsDirectory = "plex-monitor";
 
         # Security
         NoNewPrivileges = true;
@@ -41,7 +57,6 @@ in {
           cfg.downloadDir
           cfg.incompleteDir
           cfg.storage.mountPoint
-          "/var/log"
         ];
         ProtectHome = true;
         ProtectKernelTunables = true;
@@ -84,6 +84,19 @@ in {
         description = "Comma-separated list of IP subnets to bypass authentication (e.g., '192.168.1.0/24, 10.0.0.0/8')";
         example = "192.168.0.0/16, 10.0.0.0/8";
       };
+
+      username = lib.mkOption {
+        type = lib.types.str;
+        default = "admin";
+        description = "Web UI username the Plex monitor logs in with";
+      };
+
+      passwordFile = lib.mkOption {
+        type = lib.types.nullOr lib.types.path;
+        default = null;
+        description = "File containing the Web UI password for the Plex monitor (not needed with bypassLocalAuth)";
+        example = "/run/secrets/qbittorrent-webui";
+      };
     };
 
     webhook = {
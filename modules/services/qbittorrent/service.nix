@@ -62,7 +62,7 @@ in {
         "f /var/log/qbittorrent-webhook.log 0644 ${cfg.user} ${cfg.group} -"
       ]
       ++ lib.optionals (config.modules.services.plex.enable or false) [
-        "f /var/log/plex-monitor.log 0644 ${cfg.user} ${cfg.group} -"
+        "d ${cfg.dataDir}/completed.d 0750 ${cfg.user} ${cfg.group} -"
         "f /var/log/plex-qbittorrent-integration.log 0644 ${cfg.user} ${cfg.group} -"
       ];
 